@@ -0,0 +1,110 @@
+import io
+import json
+import mmap
+import struct
+from typing import Dict, Tuple
+import numpy as np
+
+# File layout (all little-endian):
+#   MAGIC (8 bytes) | header length (uint32) | JSON header | column data
+# The JSON header records the archive kind, the row count and, for every
+# column, its dtype and byte offset. Each column is one contiguous array
+# starting on a COLUMN_ALIGN boundary, so readers can map it without copying.
+MAGIC = b"BFARCH01"
+COLUMN_ALIGN = 64
+_HEADER_LEN = struct.Struct("<I")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // COLUMN_ALIGN) * COLUMN_ALIGN
+
+
+def _write(f, kind: str, columns: Dict[str, np.ndarray]):
+    arrays = {name: np.ascontiguousarray(col) for name, col in columns.items()}
+    lengths = {len(col) for col in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    rows = lengths.pop() if lengths else 0
+
+    # Column offsets depend on the header size, and the header lists the
+    # offsets, so lay the file out until the header length is stable.
+    header_len = 0
+    while True:
+        offset = _aligned(len(MAGIC) + _HEADER_LEN.size + header_len)
+        layout = []
+        for name, col in arrays.items():
+            dtype = col.dtype.newbyteorder("<")
+            layout.append({"name": name, "dtype": dtype.str, "offset": offset})
+            offset = _aligned(offset + col.size * dtype.itemsize)
+        header = json.dumps({
+            "kind": kind,
+            "rows": rows,
+            "columns": layout,
+        }).encode("utf-8")
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+
+    f.write(MAGIC)
+    f.write(_HEADER_LEN.pack(len(header)))
+    f.write(header)
+    for spec, col in zip(layout, arrays.values()):
+        f.write(b"\0" * (spec["offset"] - f.tell()))
+        f.write(col.astype(spec["dtype"], copy=False).data)
+
+
+def write_columns(file_path: str, kind: str, columns: Dict[str, np.ndarray]):
+    """
+    Write equally long 1-D arrays as a columnar archive of the given kind.
+    """
+    with open(file_path, "wb") as f:
+        _write(f, kind, columns)
+
+
+def encode_columns(kind: str, columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Encode equally long 1-D arrays in the archive format, in memory (e.g. as
+    an HTTP response body).
+    """
+    buffer = io.BytesIO()
+    _write(buffer, kind, columns)
+    return buffer.getvalue()
+
+
+def _parse(buffer, source: str) -> Tuple[str, Dict[str, np.ndarray]]:
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{source} is not a columnar archive")
+    (header_len,) = _HEADER_LEN.unpack_from(buffer, len(MAGIC))
+    start = len(MAGIC) + _HEADER_LEN.size
+    header = json.loads(bytes(buffer[start:start + header_len]).decode("utf-8"))
+
+    columns = {
+        spec["name"]: np.frombuffer(buffer, dtype=np.dtype(spec["dtype"]),
+                                    count=header["rows"], offset=spec["offset"])
+        for spec in header["columns"]
+    }
+    return header["kind"], columns
+
+
+def read_columns(file_path: str) -> Tuple[str, Dict[str, np.ndarray]]:
+    """
+    Memory-map a columnar archive and return (kind, columns).
+
+    The arrays are read-only views onto the mapping, so opening a file costs
+    no parsing or copying; pages are loaded lazily by the OS on access.
+    """
+    with open(file_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _parse(mm, file_path)
+    except ValueError:
+        mm.close()
+        raise
+
+
+def decode_columns(data: bytes) -> Tuple[str, Dict[str, np.ndarray]]:
+    """
+    Decode an in-memory archive (see encode_columns) into (kind, columns)
+    without copying the column data.
+    """
+    return _parse(data, "buffer")
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from archive import COLUMN_ALIGN, decode_columns, encode_columns, read_columns, write_columns
+
+
+def test_write_read_columns(tmp_path):
+    path = str(tmp_path / "cols.bin")
+    ids = np.arange(5, dtype=np.int64)
+    prices = np.linspace(100.0, 104.0, 5)
+    write_columns(path, "executions", {"id": ids, "price": prices})
+
+    kind, cols = read_columns(path)
+    assert kind == "executions"
+    assert cols["id"].dtype == np.int64 and cols["id"].tolist() == ids.tolist()
+    assert cols["price"].tolist() == prices.tolist()
+    # every column starts on an aligned offset inside the mapping
+    for col in cols.values():
+        assert col.__array_interface__["data"][0] % COLUMN_ALIGN == 0
+
+
+def test_encode_matches_file_format(tmp_path):
+    path = str(tmp_path / "cols.bin")
+    columns = {"minute_ns": np.arange(3, dtype=np.int64), "close": np.array([1.0, 2.0, 3.0])}
+    write_columns(path, "candles", columns)
+    data = encode_columns("candles", columns)
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+    kind, cols = decode_columns(data)
+    assert kind == "candles"
+    assert cols["close"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_write_read_empty(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    write_columns(path, "candles", {"minute_ns": np.empty(0, dtype=np.int64)})
+    kind, cols = read_columns(path)
+    assert kind == "candles" and len(cols["minute_ns"]) == 0
+
+
+def test_rejects_mismatched_and_foreign_files(tmp_path):
+    with pytest.raises(ValueError):
+        write_columns(str(tmp_path / "bad.bin"), "x",
+                      {"a": np.zeros(2), "b": np.zeros(3)})
+    other = tmp_path / "other.json"
+    other.write_text("[]" * 10)
+    with pytest.raises(ValueError):
+        read_columns(str(other))
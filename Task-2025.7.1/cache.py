@@ -0,0 +1,80 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# Response cache for the analytics API. Backends store bytes under string
+# keys with an optional expiry in seconds, mirroring the get/set(ex=)/delete
+# subset of the Redis client API, so a Redis client can be dropped in as a
+# backend without touching the callers.
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Holds at most max_entries keys; the least recently used key is evicted
+    first. ex=None keeps an entry until it is evicted or deleted.
+    """
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None):
+        expires_at = None if ex is None else self.clock() + ex
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cache_key(*parts, **params) -> str:
+    """
+    Build a stable cache key from positional parts and keyword parameters.
+    """
+    return ":".join(str(part) for part in parts) + ":" + json.dumps(
+        params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def etag(body: bytes) -> str:
+    """
+    Strong ETag for a response body.
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    Whether an If-None-Match header value matches tag (RFC 9110 weak comparison).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (value.strip() for value in if_none_match.split(","))
+    return tag in (value[2:] if value.startswith("W/") else value for value in candidates)
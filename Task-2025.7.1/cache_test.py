@@ -0,0 +1,50 @@
+from cache import MemoryCache, cache_key, etag, etag_matches
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_cache_ttl():
+    clock = FakeClock()
+    cache = MemoryCache(clock=clock)
+    cache.set("today", b"1", ex=5)
+    cache.set("closed", b"2")
+    clock.now = 4.9
+    assert cache.get("today") == b"1"
+    clock.now = 5.0
+    assert cache.get("today") is None
+    # entries without ex never expire
+    clock.now = 1e9
+    assert cache.get("closed") == b"2"
+
+
+def test_memory_cache_lru_eviction():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"a")
+    cache.set("b", b"b")
+    cache.get("a")  # a is now the most recently used
+    cache.set("c", b"c")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" and cache.get("c") == b"c"
+    cache.delete("a")
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_cache_key_is_order_independent():
+    assert cache_key("x", "2025-07-01", a=1, b="2") == cache_key("x", "2025-07-01", b="2", a=1)
+    assert cache_key("x", "2025-07-01", a=1) != cache_key("x", "2025-07-02", a=1)
+
+
+def test_etag_matches():
+    tag = etag(b'{"data": []}')
+    assert tag.startswith('"') and tag != etag(b'{"data": [1]}')
+    assert etag_matches(tag, tag)
+    assert etag_matches(f'"other", W/{tag}', tag)
+    assert etag_matches("*", tag)
+    assert not etag_matches(None, tag)
+    assert not etag_matches('"other"', tag)
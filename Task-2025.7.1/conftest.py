@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import create_engine
+
+from exercises_03 import init_schema
+from exercises_04_loadtest import ephemeral_postgres
+
+
+@pytest.fixture(scope="session")
+def pg_url():
+    """
+    URL of the pafindb database of a throwaway PostgreSQL cluster (see
+    exercises_04_loadtest.ephemeral_postgres). Tests using it are skipped
+    when initdb/pg_ctl are not on PATH or in PG_BIN.
+    """
+    cluster = ephemeral_postgres()
+    try:
+        env = cluster.__enter__()
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    yield (f"postgresql+psycopg2://{env['DB_USER']}:{env['DB_PASSWORD']}"
+           f"@{env['DB_HOST']}:{env['DB_PORT']}/{env['DB_NAME']}")
+    cluster.__exit__(None, None, None)
+
+
+@pytest.fixture
+def pg_engine(pg_url):
+    """
+    A sync engine on a freshly created exercises_03 schema.
+    """
+    engine = create_engine(pg_url, future=True)
+    init_schema(engine)
+    yield engine
+    engine.dispose()
@@ -1,7 +1,13 @@
 import os
 import time
+import logging
+import asyncio
+import argparse
 import requests
 import json
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 from utils import get_logger
 
 OUTPUT_DIR = "./output"
@@ -9,60 +15,81 @@ OUTPUT_DIR = "./output"
 # Configure logging to a file with the same base name as this script
 script_base = os.path.splitext(os.path.basename(__file__))[0]
 json_filename = os.path.join(OUTPUT_DIR, f"{script_base}.json")
+checkpoint_filename = os.path.join(OUTPUT_DIR, f"{script_base}_checkpoint.json")
+segment_dir = os.path.join(OUTPUT_DIR, f"{script_base}_segments")
 
 log_filename = f"{script_base}.log"
 logger = get_logger(log_filename=log_filename)
 
 # bitFlyer execution API endpoint and configuration constants
 API = "https://api.bitflyer.com/v1/getexecutions"
-SLEEP_INTERVAL = 1.0           # Seconds between successful API calls
+PRODUCT_CODES = ["BTC_JPY", "ETH_JPY", "FX_BTC_JPY"]  # Products crawled concurrently
+RATE_LIMIT = 500 / 300         # Requests per second shared by all products (bitFlyer: 500 per 5 min)
+RATE_BURST = 5                 # Token bucket capacity (requests that may go out back to back)
 MAX_RETRIES = 5                # Maximum number of retry attempts on failure
+RETRY_DELAY = 1.0              # Seconds to wait after the first failed attempt
 BACKOFF_FACTOR = 2.0           # Exponential backoff multiplier for retry delays
 GET_ALL = True                # If True, keep crawling until no more data
 MAX_PAGE = 20               # Maximum number of pages to fetch (for testing)
 
 
-def fetch_executions(product_code="BTC_JPY", count=100, before=None, after=None):
+def fetch_page(product_code="BTC_JPY", count=100, before=None, after=None, session=None):
     """
-    Fetch a page of executions from bitFlyer.
+    Fetch one page of executions from bitFlyer, without retrying.
+    Pass a requests.Session to reuse its keep-alive connections.
     Returns a tuple (data_list, next_before_id).
     """
-    logger.info(
-        f"Fetching executions for {product_code} (count={count}, before={before}, after={after})"
-    )
     params = {"product_code": product_code, "count": count}
     if before is not None:
         params["before"] = before   # Page backward using 'before' id
     if after is not None:
         params["after"] = after     # Page forward using 'after' id
 
-    logger.info(f"Requesting {API} with params: {params}")
+    logger.debug("Requesting %s with params: %s", API, params)
+    # Make HTTP GET request to bitFlyer API
+    resp = (session or requests).get(API, params=params, timeout=10)
+    resp.raise_for_status()      # Raise for HTTP errors
+    data = resp.json()          # Parse JSON response
+
+    # Determine next 'before' cursor (smallest execution id) for pagination
+    next_before = min(item["id"] for item in data) if data else None
+
+    # One summary line per page instead of logging the payload
+    if data and logger.isEnabledFor(logging.INFO):
+        buys = sum(1 for item in data if item["side"] == "BUY")
+        sells = sum(1 for item in data if item["side"] == "SELL")
+        logger.info("Got %d %s executions (ids %d..%d, buy=%d sell=%d)",
+                    len(data), product_code, next_before,
+                    max(item["id"] for item in data), buys, sells)
+    if logger.isEnabledFor(logging.DEBUG):
+        for item in data:
+            # Debug log each execution entry
+            logger.debug("%s: %s %s @ %s (%s)", item['id'], item['side'],
+                         item['size'], item['price'], item['exec_date'])
+
+    return data, next_before
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds to wait after a failed attempt (exponential backoff)."""
+    return RETRY_DELAY * BACKOFF_FACTOR ** (attempt - 1)
+
+
+def fetch_executions(product_code="BTC_JPY", count=100, before=None, after=None, session=None):
+    """
+    Fetch a page of executions from bitFlyer, retrying with exponential backoff.
+    For standalone use; the crawlers use fetch_executions_limited so that
+    retries are rate limited too.
+    Returns a tuple (data_list, next_before_id).
+    """
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            # Make HTTP GET request to bitFlyer API
-            resp = requests.get(API, params=params, timeout=10)
-            resp.raise_for_status()      # Raise for HTTP errors
-            data = resp.json()          # Parse JSON response
-
-            logger.info(
-                f"Got {len(data)} executions (showing up to 3): {data[:3]}…"
-            )
-            for item in data:
-                # Debug log each execution entry
-                logger.debug(
-                    f"{item['id']}: {item['side']} {item['size']} @ {item['price']} ({item['exec_date']})"
-                )
-
-            # Determine next 'before' cursor (smallest execution id) for pagination
-            next_before = min(item["id"] for item in data) if data else None
-            return data, next_before
-
+            return fetch_page(product_code, count, before, after, session)
         except Exception as e:
             # On error, wait with exponential backoff and retry
-            wait = BACKOFF_FACTOR ** (attempt - 1)
-            logger.warning(
-                f"Attempt {attempt} failed: {e!r}; retrying in {wait:.1f}s…"
-            )
+            wait = retry_delay(attempt)
+            logger.warning("Attempt %d failed: %r; retrying in %.1fs…",
+                           attempt, e, wait)
             time.sleep(wait)
 
     # If all retries fail, log error and abort
@@ -70,36 +97,282 @@ def fetch_executions(product_code="BTC_JPY", count=100, before=None, after=None)
     raise RuntimeError("Max retries exceeded")
 
 
-def crawl_all():
+class TokenBucket:
     """
-    Crawl executions until no more data (or only once if GET_ALL=False).
-    Saves fetched executions to a JSON file with overwrite mode.
+    Asyncio token bucket shared by every crawl task, so the total request
+    rate stays within the API quota however many products are crawled.
     """
-    before = None
-    all_data = []  # Accumulate executions if GET_ALL is True
-    count = 0
 
-    while count < MAX_PAGE:
-        data, next_before = fetch_executions(before=before)
+    def __init__(self, rate: float = RATE_LIMIT, capacity: float = RATE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def fetch_executions_limited(bucket: TokenBucket, product_code="BTC_JPY", count=100,
+                                   before=None, after=None, session=None):
+    """
+    Async counterpart of fetch_executions: every attempt, retries included,
+    first waits for a token from the bucket, and the blocking HTTP call runs
+    in a worker thread so other products keep going meanwhile.
+    Returns a tuple (data_list, next_before_id).
+    """
+    for attempt in range(1, MAX_RETRIES + 1):
+        await bucket.acquire()
+        try:
+            return await asyncio.to_thread(fetch_page, product_code, count, before, after, session)
+        except Exception as e:
+            wait = retry_delay(attempt)
+            logger.warning("%s attempt %d failed: %r; retrying in %.1fs…",
+                           product_code, attempt, e, wait)
+            await asyncio.sleep(wait)
+
+    logger.error("Max retries exceeded, aborting fetch_executions_limited")
+    raise RuntimeError("Max retries exceeded")
+
+
+def make_session(pool_size: int = 1) -> requests.Session:
+    """
+    Create a requests.Session with a keep-alive pool of pool_size connections.
+
+    requests does not document Session as thread-safe (cookies and adapters
+    are shared mutable state), so the crawlers give every product its own
+    session. A product has at most one request in flight, so its session is
+    only ever used by one worker thread at a time.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+async def crawl_product(product_code: str, session: requests.Session, bucket: TokenBucket,
+                        max_page: int = MAX_PAGE) -> List[dict]:
+    """
+    Walk one product's pages backward with its own 'before' cursor.
+    Each request, retries included, waits for a token from the shared bucket.
+    """
+    before = None
+    all_data = []
+    for _ in range(max_page):
+        data, next_before = await fetch_executions_limited(
+            bucket, product_code=product_code, before=before, session=session)
         if not data:
-            logger.info("No more executions, exiting crawl.")
+            logger.info("No more executions for %s, exiting crawl.", product_code)
             break
 
-        logger.info(
-            f"Processed {len(data)} executions; next before={next_before}")
+        logger.debug("Processed %d %s executions; next before=%s",
+                     len(data), product_code, next_before)
         all_data.extend(data)
         before = next_before
-        time.sleep(SLEEP_INTERVAL)
-        count += 1
         if not GET_ALL:
             # Only fetch one page if GET_ALL is False
             break
+    logger.info("Crawled %d %s executions", len(all_data), product_code)
+    return all_data
+
+
+async def crawl_products(product_codes: List[str] = PRODUCT_CODES, rate: float = RATE_LIMIT,
+                         burst: float = RATE_BURST, max_page: int = MAX_PAGE) -> Dict[str, List[dict]]:
+    """
+    Crawl several products concurrently, each over its own keep-alive session,
+    under one global rate limiter. Returns executions keyed by product code.
+    """
+    bucket = TokenBucket(rate, burst)
+    with ExitStack() as stack:
+        sessions = [stack.enter_context(make_session()) for _ in product_codes]
+        results = await asyncio.gather(
+            *(crawl_product(code, session, bucket, max_page)
+              for code, session in zip(product_codes, sessions)))
+    return dict(zip(product_codes, results))
+
+
+def product_json_filename(product_code: str) -> str:
+    """
+    Output file for a product. BTC_JPY keeps the historical file name that
+    the later exercises read.
+    """
+    if product_code == "BTC_JPY":
+        return json_filename
+    return os.path.join(OUTPUT_DIR, f"{script_base}_{product_code}.json")
+
+
+def crawl_all(product_codes: List[str] = PRODUCT_CODES):
+    """
+    Crawl executions for every product until no more data (or only once if GET_ALL=False).
+    Saves each product's executions to a JSON file with overwrite mode.
+    """
+    results = asyncio.run(crawl_products(product_codes))
+
+    for product_code, all_data in results.items():
+        # Overwrite JSON file with the latest list of executions
+        filename = product_json_filename(product_code)
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(all_data, f, indent=2, ensure_ascii=False)
+        logger.info(f"Saved {len(all_data)} executions to {filename}")
+
+
+def _write_atomic(path: str, text: str):
+    """Write a file via a temp file and rename, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CheckpointStore:
+    """
+    Persisted crawl progress per product.
+
+    For each product it records the id range [oldest_id, newest_id] that is
+    fully stored in segment files, plus the cursor of an unfinished forward
+    pass ("forward": {"after", "before", "top"}), so a crashed or truncated
+    run resumes exactly where it stopped.
+    """
+
+    def __init__(self, path: str = checkpoint_filename):
+        self.path = path
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        else:
+            self._state = {}
+
+    def get(self, product_code: str) -> Optional[dict]:
+        return self._state.get(product_code)
+
+    def update(self, product_code: str, **fields):
+        """Merge fields into a product's checkpoint and persist it at once."""
+        self._state.setdefault(product_code, {}).update(fields)
+        _write_atomic(self.path, json.dumps(self._state, indent=2))
+
+
+def write_segment(product_code: str, data: List[dict], directory: str = segment_dir) -> str:
+    """
+    Write one page of executions as an append-only NDJSON segment named by
+    its id range. Segments are never modified; rewriting the same range after
+    a crash produces the same file.
+    """
+    ids = [item["id"] for item in data]
+    product_dir = os.path.join(directory, product_code)
+    os.makedirs(product_dir, exist_ok=True)
+    path = os.path.join(product_dir, f"{min(ids):015d}-{max(ids):015d}.ndjson")
+    _write_atomic(path, "".join(
+        json.dumps(item, ensure_ascii=False) + "\n" for item in data))
+    return path
+
+
+def segment_files(product_code: str, directory: str = segment_dir) -> List[str]:
+    """List a product's segment files in id order."""
+    product_dir = os.path.join(directory, product_code)
+    if not os.path.isdir(product_dir):
+        return []
+    return [os.path.join(product_dir, name)
+            for name in sorted(os.listdir(product_dir)) if name.endswith(".ndjson")]
+
+
+async def crawl_product_incremental(product_code: str, session: requests.Session, bucket: TokenBucket,
+                                    store: CheckpointStore, mode: str = "forward",
+                                    max_page: int = MAX_PAGE, directory: str = segment_dir) -> int:
+    """
+    Fetch only what the checkpoint says is missing and store it as segments.
+
+    forward:  executions newer than newest_id, paged backward with
+              after=newest_id until the gap is closed. newest_id only moves
+              once the whole gap is stored; until then the pass's cursor is
+              checkpointed after every page.
+    backfill: executions older than oldest_id, paged with before=oldest_id;
+              oldest_id moves after every page.
+    A product without a checkpoint starts with a backfill from the newest trade.
+    Returns the number of executions fetched.
+    """
+    state = store.get(product_code)
+    if state is None or state.get("oldest_id") is None:
+        mode = "backfill"
+    fetched = 0
+
+    for _ in range(max_page):
+        state = store.get(product_code) or {}
+        if mode == "forward":
+            pending = state.get("forward") or {
+                "after": state["newest_id"], "before": None, "top": None}
+            after, before = pending["after"], pending["before"]
+        else:
+            after, before = None, state.get("oldest_id")
+
+        data, next_before = await fetch_executions_limited(
+            bucket, product_code=product_code, before=before, after=after, session=session)
+
+        if mode == "forward" and not data:
+            # Gap closed: everything up to the newest id seen is stored
+            top = pending["top"] if pending["top"] is not None else state["newest_id"]
+            store.update(product_code, newest_id=top, forward=None)
+            logger.info("%s is up to date at id %s", product_code, top)
+            break
+        if not data:
+            logger.info("No more executions for %s, backfill complete.", product_code)
+            break
+
+        path = write_segment(product_code, data, directory)
+        fetched += len(data)
+        newest = max(item["id"] for item in data)
+        if mode == "forward":
+            top = newest if pending["top"] is None else max(pending["top"], newest)
+            store.update(product_code, forward={
+                "after": after, "before": next_before, "top": top})
+        else:
+            store.update(product_code, oldest_id=next_before,
+                         newest_id=max(state.get("newest_id") or newest, newest))
+        logger.debug("Stored %d %s executions in %s", len(data), product_code, path)
 
-    # Overwrite JSON file with the latest list of executions
-    with open(json_filename, "w", encoding="utf-8") as f:
-        json.dump(all_data, f, indent=2, ensure_ascii=False)
-    logger.info(f"Saved {len(all_data)} executions to {json_filename}")
+    logger.info("Fetched %d %s executions in %s mode", fetched, product_code, mode)
+    return fetched
+
+
+async def crawl_products_incremental(product_codes: List[str] = PRODUCT_CODES, mode: str = "forward",
+                                     store: Optional[CheckpointStore] = None, rate: float = RATE_LIMIT,
+                                     burst: float = RATE_BURST, max_page: int = MAX_PAGE,
+                                     directory: str = segment_dir) -> Dict[str, int]:
+    """
+    Incremental crawl of several products, one session each, sharing one rate limiter.
+    Returns the number of executions fetched per product.
+    """
+    store = store or CheckpointStore()
+    bucket = TokenBucket(rate, burst)
+    with ExitStack() as stack:
+        sessions = [stack.enter_context(make_session()) for _ in product_codes]
+        results = await asyncio.gather(*(
+            crawl_product_incremental(code, session, bucket, store, mode, max_page, directory)
+            for code, session in zip(product_codes, sessions)))
+    return dict(zip(product_codes, results))
 
 
 if __name__ == "__main__":
-    crawl_all()
+    parser = argparse.ArgumentParser(description="Crawl bitFlyer executions.")
+    parser.add_argument(
+        "--mode", choices=["snapshot", "forward", "backfill"], default="snapshot",
+        help="snapshot: overwrite the JSON outputs; forward/backfill: "
+             "resume from the checkpoint and append segment files")
+    args = parser.parse_args()
+    if args.mode == "snapshot":
+        crawl_all()
+    else:
+        asyncio.run(crawl_products_incremental(mode=args.mode))
@@ -0,0 +1,169 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+import exercises_01
+from exercises_01 import (
+    CheckpointStore,
+    TokenBucket,
+    crawl_products,
+    crawl_products_incremental,
+    segment_files,
+)
+
+EXECUTIONS_PER_PRODUCT = 5
+
+
+class StubBitflyerHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients can keep the connection alive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        product_code = query["product_code"][0]
+        count = min(int(query["count"][0]), self.server.page_size)
+        before = int(query.get("before", [self.server.total + 1])[0])
+        after = int(query.get("after", [0])[0])
+        self.server.seen.append((product_code, self.client_address))
+        if self.server.failures:
+            # a transient server error the client has to retry
+            self.server.failures -= 1
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = [
+            {
+                "id": i,
+                "side": "BUY",
+                "price": 100.0 + i,
+                "size": 0.1,
+                "exec_date": f"2025-06-09T11:10:{i:02d}.000",
+            }
+            for i in range(before - 1, after, -1)
+        ][:count]
+
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBitflyerHandler)
+    server.seen = []
+    server.total = EXECUTIONS_PER_PRODUCT
+    server.page_size = 100
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        exercises_01, "API", f"http://127.0.0.1:{server.server_port}/v1/getexecutions")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_crawl_products(stub_api):
+    products = ["BTC_JPY", "ETH_JPY", "FX_BTC_JPY"]
+    results = asyncio.run(crawl_products(products, rate=1000, burst=10))
+
+    assert set(results) == set(products)
+    for code in products:
+        assert [item["id"] for item in results[code]] == [5, 4, 3, 2, 1]
+
+    # one full page plus one empty page per product
+    assert len(stub_api.seen) == 2 * len(products)
+    # keep-alive: requests reuse at most one connection per product
+    assert len({addr for _, addr in stub_api.seen}) <= len(products)
+
+
+def test_token_bucket_limits_rate():
+    async def take(bucket, n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    asyncio.run(take(bucket, 6))
+    # the first token is free, the next five are spaced 1/50 s apart
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+class CountingBucket(TokenBucket):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.taken = 0
+
+    async def acquire(self):
+        await super().acquire()
+        self.taken += 1
+
+
+def test_retries_take_tokens(stub_api, monkeypatch):
+    monkeypatch.setattr(exercises_01, "RETRY_DELAY", 0)
+    stub_api.failures = 2
+    bucket = CountingBucket(1000, 10)
+
+    async def crawl():
+        with exercises_01.make_session() as session:
+            return await exercises_01.crawl_product("BTC_JPY", session, bucket)
+
+    assert [item["id"] for item in asyncio.run(crawl())] == [5, 4, 3, 2, 1]
+    # two failed attempts, one full page and one empty page, each paid for
+    assert len(stub_api.seen) == 4
+    assert bucket.taken == 4
+
+
+def test_crawl_incremental_checkpoints(stub_api, tmp_path):
+    stub_api.page_size = 2
+    store = CheckpointStore(str(tmp_path / "checkpoint.json"))
+    segments = str(tmp_path / "segments")
+
+    def run(mode, max_page=10):
+        return asyncio.run(crawl_products_incremental(
+            ["BTC_JPY"], mode=mode, store=store, rate=1000, burst=10,
+            max_page=max_page, directory=segments))
+
+    def stored_ids():
+        ids = []
+        for path in segment_files("BTC_JPY", segments):
+            with open(path, encoding="utf-8") as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+        return sorted(ids)
+
+    # first run has no checkpoint: backfill from the newest trade, cut short
+    assert run("forward", max_page=2) == {"BTC_JPY": 4}
+    assert store.get("BTC_JPY") == {"oldest_id": 2, "newest_id": 5}
+
+    # backfill resumes below oldest_id
+    assert run("backfill") == {"BTC_JPY": 1}
+    assert stored_ids() == [1, 2, 3, 4, 5]
+
+    # new trades arrive; a forward pass is interrupted after one page
+    stub_api.total = 10
+    assert run("forward", max_page=1) == {"BTC_JPY": 2}
+    assert store.get("BTC_JPY")["newest_id"] == 5
+    assert store.get("BTC_JPY")["forward"] == {"after": 5, "before": 9, "top": 10}
+
+    # the next run resumes the pass from the checkpoint (reloaded from disk)
+    store = CheckpointStore(str(tmp_path / "checkpoint.json"))
+    assert run("forward") == {"BTC_JPY": 3}
+    assert store.get("BTC_JPY")["newest_id"] == 10
+    assert store.get("BTC_JPY")["forward"] is None
+    assert stored_ids() == list(range(1, 11))
+
+    # nothing new: a forward run only costs one empty request
+    seen = len(stub_api.seen)
+    assert run("forward") == {"BTC_JPY": 0}
+    assert len(stub_api.seen) == seen + 1
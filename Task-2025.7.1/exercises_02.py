@@ -1,9 +1,12 @@
 import os
 import json
-from datetime import datetime, timezone
+import itertools
+from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import List, Dict
-from utils import get_logger
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+import numpy as np
+from archive import read_columns, write_columns
+from utils import get_logger, datetime_to_ns, ns_to_datetime, exec_date_to_ns, iter_json_records
 
 OUTPUT_DIR = "./output"
 
@@ -13,10 +16,30 @@ candles_filename = os.path.join(
     OUTPUT_DIR, f"{script_base}_candles.json")  # Output candles JSON
 image_filename = os.path.join(
     OUTPUT_DIR, f"{script_base}_candles.png")  # Output image file
+candles_archive_filename = os.path.join(
+    OUTPUT_DIR, f"{script_base}_candles.bin")  # Output candles binary archive
 
 log_filename = f"{script_base}.log"
 logger = get_logger(log_filename=log_filename)
 
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+READ_CHUNK_SIZE = 1 << 20      # Characters read per refill by the streaming JSON reader
+BATCH_SIZE = 100_000           # Executions per ExecutionBatch when streaming
+
+# Archive kinds written to the binary archive header
+EXECUTIONS_ARCHIVE = "executions"
+CANDLES_ARCHIVE = "candles"
+
+# Supported candle resolutions for rollup_candles
+TIMEFRAMES = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
 
 @dataclass
 class Execution:
@@ -37,60 +60,350 @@ class Candle:
     vwap: float
 
 
+@dataclass
+class ExecutionBatch:
+    """
+    Columnar store for executions: one contiguous NumPy array per field
+    instead of one Python object per trade.
+    """
+    id: np.ndarray            # int64
+    price: np.ndarray         # float64
+    size: np.ndarray          # float64
+    timestamp_ns: np.ndarray  # int64, epoch nanoseconds (UTC)
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def from_columns(cls, ids, prices, sizes, timestamps_ns) -> "ExecutionBatch":
+        """Build a batch from column sequences, coercing them to the column dtypes."""
+        return cls(
+            id=np.asarray(ids, dtype=np.int64),
+            price=np.asarray(prices, dtype=np.float64),
+            size=np.asarray(sizes, dtype=np.float64),
+            timestamp_ns=np.asarray(timestamps_ns, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "ExecutionBatch":
+        """Build a batch from raw bitFlyer execution dicts."""
+        ids, prices, sizes, timestamps = [], [], [], []
+        for item in records:
+            ids.append(item['id'])
+            prices.append(item['price'])
+            sizes.append(item['size'])
+            timestamps.append(exec_date_to_ns(item['exec_date']))
+        return cls.from_columns(ids, prices, sizes, timestamps)
+
+    @classmethod
+    def from_executions(cls, execs: List[Execution]) -> "ExecutionBatch":
+        """Adapter from the Execution list API."""
+        return cls.from_columns(
+            [e.id for e in execs],
+            [e.price for e in execs],
+            [e.size for e in execs],
+            [datetime_to_ns(e.timestamp) for e in execs],
+        )
+
+    def to_executions(self) -> List[Execution]:
+        """Adapter to the Execution list API."""
+        return [
+            Execution(id=i, price=p, size=s, timestamp=ns_to_datetime(ns))
+            for i, p, s, ns in zip(self.id.tolist(), self.price.tolist(),
+                                   self.size.tolist(), self.timestamp_ns.tolist())
+        ]
+
+
+def iter_execution_records(file_path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Incrementally parse raw execution dicts from a JSON array (as written by
+    exercises_01) or from NDJSON (one object per line); see iter_json_records.
+    """
+    return iter_json_records(file_path, chunk_size=chunk_size)
+
+
+def iter_execution_batches(file_path: str, batch_size: int = BATCH_SIZE,
+                           chunk_size: int = READ_CHUNK_SIZE) -> Iterator[ExecutionBatch]:
+    """
+    Stream a JSON or NDJSON execution file as ExecutionBatches of at most
+    batch_size executions.
+    """
+    records = iter_execution_records(file_path, chunk_size=chunk_size)
+    total = 0
+    while True:
+        batch = ExecutionBatch.from_records(itertools.islice(records, batch_size))
+        if not len(batch):
+            break
+        total += len(batch)
+        yield batch
+    logger.info(f"Streamed {total} executions from {file_path}")
+
+
+def load_execution_batch_from_json(file_path: str) -> ExecutionBatch:
+    """
+    Load raw execution JSON data into a columnar ExecutionBatch.
+    """
+    batch = ExecutionBatch.from_records(iter_execution_records(file_path))
+    logger.info(f"Loaded {len(batch)} executions from {file_path}")
+    return batch
+
+
 def load_executions_from_json(file_path: str) -> List[Execution]:
     """
     Load raw execution JSON data and convert to a list of Execution objects.
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        raw = json.load(f)
-    execs: List[Execution] = []
-    for item in raw:
-        ts = datetime.fromisoformat(item['exec_date'])
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        execs.append(Execution(
-            id=item['id'],
-            price=item['price'],
-            size=item['size'],
-            timestamp=ts
-        ))
-    logger.info(f"Loaded {len(execs)} executions from {file_path}")
-    return execs
+    return load_execution_batch_from_json(file_path).to_executions()
+
+
+def _reduce_by_minute(batch: ExecutionBatch):
+    """
+    Segmented reduction of a batch into per-minute OHLCV columns.
+
+    Executions are stably sorted by minute, so trades inside a minute keep
+    their input order (open is the first, close the last). High and low use
+    ufunc.reduceat over the bucket start offsets; volume and notional use
+    np.bincount, which adds each bucket left to right like the per-Candle
+    sum() (reduceat adds pairwise and can differ in the last bits).
+    Returns (minute_ns, open, high, low, close, volume, notional) arrays.
+    """
+    minutes = batch.timestamp_ns - batch.timestamp_ns % NS_PER_MINUTE
+    prices = batch.price
+    sizes = batch.size
+    if len(minutes) > 1 and np.any(minutes[1:] < minutes[:-1]):
+        order = np.argsort(minutes, kind='stable')
+        minutes = minutes[order]
+        prices = prices[order]
+        sizes = sizes[order]
+
+    if len(minutes) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return np.empty(0, dtype=np.int64), empty, empty, empty, empty, empty, empty
 
+    new_minute = np.concatenate(([True], minutes[1:] != minutes[:-1]))
+    starts = np.flatnonzero(new_minute)
+    ends = np.append(starts[1:], len(minutes))
+    segment = np.cumsum(new_minute) - 1
+    return (
+        minutes[starts],
+        prices[starts],
+        np.maximum.reduceat(prices, starts),
+        np.minimum.reduceat(prices, starts),
+        prices[ends - 1],
+        np.bincount(segment, weights=sizes, minlength=len(starts)),
+        np.bincount(segment, weights=prices * sizes, minlength=len(starts)),
+    )
 
-def aggregate_to_candles(execs: List[Execution], last_close: float) -> Dict[datetime, Candle]:
+
+def aggregate_to_candles(execs: Union[List[Execution], ExecutionBatch], last_close: float,
+                         fill_gaps: bool = False) -> Dict[datetime, Candle]:
     """
     Group executions by minute and build a Candle for each minute.
+    Accepts either a list of Execution objects or an ExecutionBatch.
+    With fill_gaps=True, minutes without trades between the first and last
+    trade get a flat candle (see fill_candle_gaps).
     """
-    from collections import defaultdict
-    buckets: Dict[datetime, List[Execution]] = defaultdict(list)
-    for ex in execs:
-        minute = ex.timestamp.replace(second=0, microsecond=0)
-        buckets[minute].append(ex)
+    if not isinstance(execs, ExecutionBatch):
+        execs = ExecutionBatch.from_executions(execs)
+
+    minutes, o, h, l, c, v, notional = _reduce_by_minute(execs)
+    vw = notional / v
 
     result: Dict[datetime, Candle] = {}
-    for minute in sorted(buckets):
-        group = buckets[minute]
-        if group:
-            prices = [e.price for e in group]
-            sizes = [e.size for e in group]
-            o = group[0].price
-            c = group[-1].price
-            h = max(prices)
-            l = min(prices)
-            v = sum(sizes)
-            vw = sum(p * s for p, s in zip(prices, sizes)) / v
-        else:
-            o = h = l = c = last_close
-            v = 0
-            vw = last_close
-        candle = Candle(minute, o, h, l, c, v, vw)
-        result[minute] = candle
-        last_close = candle.close
+    for row in zip(minutes.tolist(), o.tolist(), h.tolist(), l.tolist(),
+                   c.tolist(), v.tolist(), vw.tolist()):
+        minute = ns_to_datetime(row[0])
+        result[minute] = Candle(minute, *row[1:])
+    if fill_gaps:
+        result = fill_candle_gaps(result, last_close)
+    logger.info(f"Aggregated into {len(result)} candles")
+    return result
+
+
+def aggregate_batches_to_candles(batches: Iterable[ExecutionBatch], last_close: float,
+                                 fill_gaps: bool = False) -> Dict[datetime, Candle]:
+    """
+    Aggregate a stream of batches (e.g. from iter_execution_batches) into
+    1-minute candles. Only per-minute state is kept, so memory is bounded by
+    the number of minutes rather than the number of executions. Slices of the
+    same minute are merged in stream order. OHLC equals aggregate_to_candles
+    on the concatenated executions; volume and vwap are float sums added per
+    slice, so they are equal only up to float rounding.
+    """
+    states: Dict[int, _OpenCandle] = {}
+    for batch in batches:
+        for minute_ns, o, h, l, c, v, notional in zip(
+                *(col.tolist() for col in _reduce_by_minute(batch))):
+            state = states.get(minute_ns)
+            if state is None:
+                states[minute_ns] = _OpenCandle(minute_ns, o, h, l, c, v, notional)
+            else:
+                state.merge(h, l, c, v, notional)
+
+    result: Dict[datetime, Candle] = {}
+    for minute_ns in sorted(states):
+        candle = states[minute_ns].to_candle()
+        result[candle.minute] = candle
+    if fill_gaps:
+        result = fill_candle_gaps(result, last_close)
     logger.info(f"Aggregated into {len(result)} candles")
     return result
 
 
+@dataclass
+class _OpenCandle:
+    """
+    Running OHLCV state of one minute; notional is sum(price * size).
+    """
+    minute_ns: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    notional: float
+
+    def merge(self, high: float, low: float, close: float, volume: float, notional: float):
+        """Fold a later slice of the same minute into this state."""
+        self.high = max(self.high, high)
+        self.low = min(self.low, low)
+        self.close = close
+        self.volume += volume
+        self.notional += notional
+
+    def to_candle(self) -> Candle:
+        # A bucket made only of flat (zero-volume) candles has no traded notional
+        vwap = self.notional / self.volume if self.volume else self.close
+        return Candle(ns_to_datetime(self.minute_ns), self.open, self.high,
+                      self.low, self.close, self.volume, vwap)
+
+
+class CandleBuilder:
+    """
+    Incremental 1-minute candle builder.
+
+    Only the currently open minute is held in memory. A candle is closed as
+    soon as an execution from a later minute arrives and is handed out by
+    flush_closed(). Executions are expected in time order; anything for a
+    minute that is already closed is dropped and counted in `late_count`.
+    """
+
+    def __init__(self):
+        self._open: Optional[_OpenCandle] = None
+        self._closed: List[Candle] = []
+        self.late_count = 0
+
+    @property
+    def open_candle(self) -> Optional[Candle]:
+        """Snapshot of the still-open minute, or None before the first push."""
+        return self._open.to_candle() if self._open else None
+
+    def push(self, execution: Execution):
+        """Add one execution."""
+        ns = datetime_to_ns(execution.timestamp)
+        p, s = execution.price, execution.size
+        self._push_slice(ns - ns % NS_PER_MINUTE, p, p, p, p, s, p * s)
+
+    def push_batch(self, execs: Union[ExecutionBatch, List[Execution]]):
+        """
+        Add many executions at once. The batch is reduced per minute with the
+        vectorized engine first, so the Python loop runs once per minute.
+        """
+        if not isinstance(execs, ExecutionBatch):
+            execs = ExecutionBatch.from_executions(execs)
+        columns = _reduce_by_minute(execs)
+        for row in zip(*(col.tolist() for col in columns)):
+            self._push_slice(*row)
+
+    def _push_slice(self, minute_ns: int, o: float, h: float, l: float, c: float, v: float, notional: float):
+        current = self._open
+        if current is not None:
+            if minute_ns == current.minute_ns:
+                current.merge(h, l, c, v, notional)
+                return
+            if minute_ns < current.minute_ns:
+                self.late_count += 1
+                logger.warning(
+                    f"Dropping late execution(s) for closed minute {ns_to_datetime(minute_ns).isoformat()}")
+                return
+            self._closed.append(current.to_candle())
+        self._open = _OpenCandle(minute_ns, o, h, l, c, v, notional)
+
+    def flush_closed(self) -> List[Candle]:
+        """Return and forget every candle closed since the last flush."""
+        closed, self._closed = self._closed, []
+        return closed
+
+    def close(self) -> List[Candle]:
+        """End of stream: close the open minute too and flush everything."""
+        if self._open is not None:
+            self._closed.append(self._open.to_candle())
+            self._open = None
+        return self.flush_closed()
+
+
+def fill_candle_gaps(candles: Dict[datetime, Candle], last_close: float,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[datetime, Candle]:
+    """
+    Return a copy of 1-minute candles with a flat candle for every missing minute.
+
+    A flat candle has open = high = low = close = the previous close (or
+    last_close before the first real candle), zero volume and vwap equal to
+    that close. The range defaults to the first..last minute of `candles`;
+    pass start/end (inclusive, minute-aligned) to pad beyond it.
+    """
+    if not candles and (start is None or end is None):
+        return {}
+    first_ns = datetime_to_ns(start if start is not None else min(candles))
+    last_ns = datetime_to_ns(end if end is not None else max(candles))
+    by_ns = {datetime_to_ns(m): c for m, c in candles.items()}
+
+    result: Dict[datetime, Candle] = {}
+    for minute_ns in range(first_ns, last_ns + 1, NS_PER_MINUTE):
+        candle = by_ns.get(minute_ns)
+        if candle is None:
+            minute = ns_to_datetime(minute_ns)
+            candle = Candle(minute, last_close, last_close, last_close,
+                            last_close, 0.0, last_close)
+        result[candle.minute] = candle
+        last_close = candle.close
+    return result
+
+
+def rollup_candles(candles: Dict[datetime, Candle], timeframe: str) -> Dict[datetime, Candle]:
+    """
+    Derive coarser candles (see TIMEFRAMES) from 1-minute candles.
+
+    Buckets are aligned to the Unix epoch (so 1d buckets are UTC days). OHLC
+    is merged in time order, volume is summed and VWAP is recomputed from the
+    per-candle notional (vwap * volume).
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(
+            f"Unsupported timeframe {timeframe!r}; expected one of {list(TIMEFRAMES)}")
+    step_ns = TIMEFRAMES[timeframe] // timedelta(microseconds=1) * 1000
+
+    buckets: Dict[int, _OpenCandle] = {}
+    for minute in sorted(candles):
+        c = candles[minute]
+        minute_ns = datetime_to_ns(minute)
+        key = minute_ns - minute_ns % step_ns
+        notional = c.vwap * c.volume
+        state = buckets.get(key)
+        if state is None:
+            buckets[key] = _OpenCandle(key, c.open, c.high, c.low, c.close,
+                                       c.volume, notional)
+        else:
+            state.merge(c.high, c.low, c.close, c.volume, notional)
+
+    result = {}
+    for state in buckets.values():
+        candle = state.to_candle()
+        result[candle.minute] = candle
+    logger.info(
+        f"Rolled up {len(candles)} candles into {len(result)} {timeframe} candles")
+    return result
+
+
 def save_candles_to_json(candles: Dict[datetime, Candle], file_path: str):
     """
     Save candles dict to JSON file, serializing datetimes to ISO strings.
@@ -111,19 +424,123 @@ def save_candles_to_json(candles: Dict[datetime, Candle], file_path: str):
     logger.info(f"Saved {len(out)} candles to {file_path}")
 
 
+def load_candles_from_json(file_path: str) -> Dict[datetime, Candle]:
+    """
+    Load candles written by save_candles_to_json.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    candles: Dict[datetime, Candle] = {}
+    for item in raw:
+        minute = datetime.fromisoformat(item['minute'])
+        candles[minute] = Candle(minute, item['open'], item['high'], item['low'],
+                                 item['close'], item['volume'], item['vwap'])
+    logger.info(f"Loaded {len(candles)} candles from {file_path}")
+    return candles
+
+
+def save_executions_to_archive(batch: ExecutionBatch, file_path: str):
+    """
+    Save an ExecutionBatch as a columnar binary archive (see archive.py).
+    """
+    write_columns(file_path, EXECUTIONS_ARCHIVE, {
+        'id': batch.id,
+        'price': batch.price,
+        'size': batch.size,
+        'timestamp_ns': batch.timestamp_ns,
+    })
+    logger.info(f"Archived {len(batch)} executions to {file_path}")
+
+
+def load_executions_from_archive(file_path: str) -> ExecutionBatch:
+    """
+    Memory-map an executions archive. The batch columns are zero-copy,
+    read-only views onto the file.
+    """
+    kind, cols = read_columns(file_path)
+    if kind != EXECUTIONS_ARCHIVE:
+        raise ValueError(f"{file_path} holds {kind}, not {EXECUTIONS_ARCHIVE}")
+    return ExecutionBatch(cols['id'], cols['price'], cols['size'], cols['timestamp_ns'])
+
+
+def save_candles_to_archive(candles: Dict[datetime, Candle], file_path: str):
+    """
+    Save candles as a columnar binary archive keyed by epoch-ns minute.
+    """
+    rows = list(candles.values())
+    columns = {'minute_ns': np.array([datetime_to_ns(c.minute) for c in rows], dtype=np.int64)}
+    for field in ('open', 'high', 'low', 'close', 'volume', 'vwap'):
+        columns[field] = np.array([getattr(c, field) for c in rows], dtype=np.float64)
+    write_columns(file_path, CANDLES_ARCHIVE, columns)
+    logger.info(f"Archived {len(rows)} candles to {file_path}")
+
+
+def load_candles_from_archive(file_path: str) -> Dict[datetime, Candle]:
+    """
+    Load candles from a columnar binary archive.
+    """
+    kind, cols = read_columns(file_path)
+    if kind != CANDLES_ARCHIVE:
+        raise ValueError(f"{file_path} holds {kind}, not {CANDLES_ARCHIVE}")
+    fields = ('open', 'high', 'low', 'close', 'volume', 'vwap')
+    candles: Dict[datetime, Candle] = {}
+    for minute_ns, *values in zip(cols['minute_ns'].tolist(), *(cols[f].tolist() for f in fields)):
+        minute = ns_to_datetime(minute_ns)
+        candles[minute] = Candle(minute, *values)
+    return candles
+
+
+def convert_executions_json_to_archive(json_path: str, archive_path: str):
+    """Convert a raw executions JSON/NDJSON dump into a binary archive."""
+    save_executions_to_archive(load_execution_batch_from_json(json_path), archive_path)
+
+
+def convert_executions_archive_to_json(archive_path: str, json_path: str):
+    """
+    Convert an executions archive back to bitFlyer-style JSON. Only the
+    columns the archive stores (id, price, size, exec_date) are written.
+    """
+    batch = load_executions_from_archive(archive_path)
+    out = [
+        {'id': i, 'price': p, 'size': s,
+         'exec_date': ns_to_datetime(ns).strftime('%Y-%m-%dT%H:%M:%S.%f')}
+        for i, p, s, ns in zip(batch.id.tolist(), batch.price.tolist(),
+                               batch.size.tolist(), batch.timestamp_ns.tolist())
+    ]
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
+    logger.info(f"Saved {len(out)} executions to {json_path}")
+
+
+def convert_candles_json_to_archive(json_path: str, archive_path: str):
+    """Convert a candles JSON file into a binary archive."""
+    save_candles_to_archive(load_candles_from_json(json_path), archive_path)
+
+
+def convert_candles_archive_to_json(archive_path: str, json_path: str):
+    """Convert a candles archive back to the JSON read by the chart script."""
+    save_candles_to_json(load_candles_from_archive(archive_path), json_path)
+
+
 def main():
-    # Load raw executions from JSON
-    execs = load_executions_from_json(json_filename)
+    # Stream raw executions from JSON in bounded-size columnar batches
+    batches = iter_execution_batches(json_filename)
+    first = next(batches, None)
 
     # Determine initial last_close as the first execution price
-    initial_close = execs[0].price if execs else 0.0
+    initial_close = float(first.price[0]) if first is not None else 0.0
 
     # Aggregate into 1-minute candles
-    candles = aggregate_to_candles(execs, last_close=initial_close)
+    if first is not None:
+        batches = itertools.chain([first], batches)
+    candles = aggregate_batches_to_candles(batches, last_close=initial_close)
 
     # Save candles to JSON for tests
     save_candles_to_json(candles, candles_filename)
 
+    # Save candles to a binary archive for memory-mapped readers
+    save_candles_to_archive(candles, candles_archive_filename)
+
 
 if __name__ == '__main__':
     main()
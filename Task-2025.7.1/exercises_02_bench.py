@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+import numpy as np
+
+OUTPUT_DIR = "./output"
+BENCH_DIR = os.path.join(OUTPUT_DIR, "bench")
+
+script_base = os.path.splitext(os.path.basename(__file__))[0]
+results_filename = os.path.join(OUTPUT_DIR, f"{script_base}.json")
+baseline_filename = os.path.join(OUTPUT_DIR, f"{script_base}_baseline.json")
+
+# Synthetic dataset sizes; 10m is opt-in (about 2 GB of JSON)
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_SCALES = ("10k", "1m")
+GENERATE_CHUNK = 100_000   # Executions formatted per write when generating
+START_TIME = "2025-07-01T00:00:00"
+MEAN_GAP_MS = 50           # Mean time between synthetic executions
+START_PRICE = 15_000_000.0
+
+# A regression is a stage throughput below baseline * (1 - TOLERANCE) or a
+# peak RSS above baseline * (1 + TOLERANCE). Stages faster than
+# MIN_COMPARE_SECONDS in the baseline are too noisy to compare.
+TOLERANCE = 0.25
+MIN_COMPARE_SECONDS = 0.05
+
+
+def generate_executions(file_path: str, rows: int, seed: int = 0):
+    """
+    Write rows synthetic bitFlyer executions as a JSON array, newest first
+    like the API returns them: a random walk in price, exponential gaps
+    between trades and millisecond exec_date strings.
+    """
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(MEAN_GAP_MS, rows).astype(np.int64) + 1
+    times = np.datetime64(START_TIME, "ms") + np.cumsum(gaps).astype("timedelta64[ms]")
+    prices = np.round(START_PRICE + np.cumsum(rng.normal(0, 500, rows)))
+    sizes = np.round(rng.exponential(0.02, rows) + 0.0001, 8)
+    sides = np.where(rng.random(rows) < 0.5, "BUY", "SELL")
+
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for stop in range(rows, 0, -GENERATE_CHUNK):
+            start = max(stop - GENERATE_CHUNK, 0)
+            dates = np.datetime_as_string(times[start:stop], unit="ms")
+            items = [
+                '{"id":%d,"side":"%s","price":%.1f,"size":%.8f,"exec_date":"%s",'
+                '"buy_child_order_acceptance_id":"JRF%08dB","sell_child_order_acceptance_id":"JRF%08dS"}'
+                % (i + 1, sides[i], prices[i], sizes[i], dates[i - start], i, i)
+                for i in range(stop - 1, start - 1, -1)
+            ]
+            if stop != rows:
+                f.write(",")
+            f.write(",\n".join(items))
+        f.write("]")
+    os.replace(tmp_path, file_path)
+
+
+def dataset(scale: str) -> str:
+    """
+    Return the path of the synthetic dataset for scale, generating it once.
+    """
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"executions_{scale}.json")
+    if not os.path.exists(path):
+        generate_executions(path, SCALES[scale])
+    return path
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def _timed(stages: Dict[str, float], name: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    stages[name] = time.perf_counter() - start
+    return result
+
+
+def run_pipeline(pipeline: str, json_path: str) -> dict:
+    """
+    Run one pipeline over json_path and return its stage timings and peak
+    RSS. Meant to run in a fresh process, so the RSS is the pipeline's own.
+
+    Pipelines:
+      objects   -> load_executions_from_json, aggregate_to_candles, save_candles_to_json
+      columnar  -> load_execution_batch_from_json, aggregate_to_candles, save_candles_to_json
+      streaming -> iter_execution_batches + aggregate_batches_to_candles, save_candles_to_archive
+    """
+    import exercises_02 as ex
+
+    stages: Dict[str, float] = {}
+    out_path = os.path.join(BENCH_DIR, f"candles_{pipeline}.out")
+    if pipeline == "objects":
+        execs = _timed(stages, "load", ex.load_executions_from_json, json_path)
+        candles = _timed(stages, "aggregate", ex.aggregate_to_candles, execs, execs[0].price)
+        _timed(stages, "save", ex.save_candles_to_json, candles, out_path)
+    elif pipeline == "columnar":
+        batch = _timed(stages, "load", ex.load_execution_batch_from_json, json_path)
+        candles = _timed(stages, "aggregate", ex.aggregate_to_candles, batch, float(batch.price[0]))
+        _timed(stages, "save", ex.save_candles_to_json, candles, out_path)
+    elif pipeline == "streaming":
+        # loading and aggregating are interleaved, so they are timed together
+        candles = _timed(stages, "load+aggregate", lambda: ex.aggregate_batches_to_candles(
+            ex.iter_execution_batches(json_path), last_close=0.0))
+        _timed(stages, "save", ex.save_candles_to_archive, candles, out_path)
+    else:
+        raise ValueError(f"Unknown pipeline: {pipeline}")
+    os.remove(out_path)
+    return {"stages": stages, "candles": len(candles), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench(scales: List[str], pipelines: List[str], repeat: int) -> dict:
+    """
+    Benchmark every pipeline at every scale, each run in its own process.
+    Timings are the best of repeat runs; peak RSS is the largest seen.
+    """
+    results = {}
+    spawn = get_context("spawn")
+    for scale in scales:
+        rows = SCALES[scale]
+        json_path = dataset(scale)
+        for pipeline in pipelines:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    runs.append(pool.submit(run_pipeline, pipeline, json_path).result())
+            stages = {}
+            for name in runs[0]["stages"]:
+                seconds = min(run["stages"][name] for run in runs)
+                stages[name] = {"seconds": round(seconds, 6), "rows_per_s": round(rows / seconds)}
+            case = f"{pipeline}/{scale}"
+            results[case] = {
+                "rows": rows,
+                "candles": runs[0]["candles"],
+                "stages": stages,
+                "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+            }
+            print(f"{case:<20} " + "  ".join(
+                f"{name} {s['seconds']:.3f}s ({s['rows_per_s']:,}/s)" for name, s in stages.items())
+                + f"  peak {results[case]['peak_rss_mb']} MB", flush=True)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Compare results with a baseline and describe every stage that got
+    slower, or every case that got bigger, by more than tolerance. Cases
+    missing from the baseline and stages shorter than MIN_COMPARE_SECONDS
+    are not compared.
+    """
+    regressions = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        for name, stage in current["stages"].items():
+            base_stage = base["stages"].get(name)
+            if not base_stage or base_stage["seconds"] < MIN_COMPARE_SECONDS:
+                continue
+            if stage["rows_per_s"] < base_stage["rows_per_s"] * (1 - tolerance):
+                regressions.append(
+                    f"{case} {name}: {stage['rows_per_s']:,} rows/s vs baseline {base_stage['rows_per_s']:,}")
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{case} peak RSS: {current['peak_rss_mb']} MB vs baseline {base['peak_rss_mb']} MB")
+    return regressions
+
+
+def _environment() -> dict:
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the exercises_02 candle pipeline.")
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES),
+                        help=f"comma-separated dataset sizes from {', '.join(SCALES)}")
+    parser.add_argument("--with-10m", action="store_true", help="also run the 10m dataset")
+    parser.add_argument("--pipelines", default="objects,columnar,streaming",
+                        help="comma-separated pipelines to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best time is kept")
+    parser.add_argument("--baseline", default=baseline_filename, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results as the new baseline instead of checking")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed relative slowdown / growth before failing")
+    args = parser.parse_args(argv)
+
+    scales = [s for s in args.scales.split(",") if s]
+    if args.with_10m and "10m" not in scales:
+        scales.append("10m")
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scales: {', '.join(unknown)}")
+
+    report = {"environment": _environment(),
+              "results": bench(scales, args.pipelines.split(","), args.repeat)}
+    with open(results_filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {results_filename}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = find_regressions(report["results"], baseline["results"], args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+from exercises_02 import load_executions_from_json
+from exercises_02_bench import find_regressions, generate_executions
+
+
+def test_generate_executions(tmp_path):
+    path = str(tmp_path / "executions.json")
+    generate_executions(path, 250)
+    execs = load_executions_from_json(path)
+    assert len(execs) == 250
+    # newest first, like the bitFlyer API
+    assert [e.id for e in execs] == list(range(250, 0, -1))
+    assert all(a.timestamp >= b.timestamp for a, b in zip(execs, execs[1:]))
+    assert all(e.size > 0 for e in execs)
+
+
+def _case(load_rate, load_seconds=1.0, rss=100.0):
+    return {"stages": {"load": {"seconds": load_seconds, "rows_per_s": load_rate}},
+            "peak_rss_mb": rss}
+
+
+def test_find_regressions():
+    baseline = {"objects/1m": _case(100_000)}
+    assert find_regressions({"objects/1m": _case(80_000)}, baseline, 0.25) == []
+    assert len(find_regressions({"objects/1m": _case(70_000)}, baseline, 0.25)) == 1
+    assert len(find_regressions({"objects/1m": _case(100_000, rss=130.0)}, baseline, 0.25)) == 1
+    # unknown cases and stages too short to time reliably are skipped
+    assert find_regressions({"objects/10m": _case(1)}, baseline, 0.25) == []
+    short = {"objects/1m": _case(100_000, load_seconds=0.001)}
+    assert find_regressions({"objects/1m": _case(1)}, short, 0.25) == []
@@ -1,14 +1,31 @@
 import json
-from datetime import datetime, timezone
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import numpy as np
 import pytest
 
 # adjust this import to match your script filename (without .py)
 from exercises_02 import (
     Execution,
     Candle,
+    CandleBuilder,
+    ExecutionBatch,
+    load_execution_batch_from_json,
     load_executions_from_json,
     aggregate_to_candles,
+    aggregate_batches_to_candles,
+    iter_execution_batches,
+    iter_execution_records,
+    fill_candle_gaps,
+    rollup_candles,
     save_candles_to_json,
+    load_candles_from_json,
+    save_executions_to_archive,
+    load_executions_from_archive,
+    save_candles_to_archive,
+    load_candles_from_archive,
+    convert_executions_archive_to_json,
+    convert_candles_archive_to_json,
 )
 
 
@@ -62,6 +79,23 @@ def test_load_executions_from_json(sample_json_file):
     assert first.timestamp == expect_ts
 
 
+def test_load_execution_batch_from_json(sample_json_file):
+    batch = load_execution_batch_from_json(sample_json_file)
+    assert isinstance(batch, ExecutionBatch)
+    assert len(batch) == len(SAMPLE_EXEC_JSON)
+    assert batch.id.dtype == "int64"
+    assert batch.price.dtype == "float64"
+    assert batch.timestamp_ns.dtype == "int64"
+    # 2025-06-09T11:10:10Z in epoch nanoseconds
+    assert batch.timestamp_ns[0] == 1749467410 * 1_000_000_000
+
+    # the adapter round-trips to the Execution list API
+    execs = batch.to_executions()
+    assert execs == load_executions_from_json(sample_json_file)
+    roundtrip = ExecutionBatch.from_executions(execs)
+    assert roundtrip.timestamp_ns.tolist() == batch.timestamp_ns.tolist()
+
+
 def test_aggregate_to_candles():
     # prepare three Execution objects in two distinct minutes
     execs = [
@@ -89,8 +123,8 @@ def test_aggregate_to_candles():
     assert c1.high == 110.0
     assert c1.low == 100.0
     assert c1.close == 110.0
-    assert c1.volume == pytest.approx(3.0)
-    assert c1.vwap == pytest.approx((100*1 + 110*2) / 3)
+    assert c1.volume == 3.0
+    assert c1.vwap == (100*1 + 110*2) / 3
 
     c2 = candles[minutes[1]]
     # minute 11:11: only one trade
@@ -98,8 +132,65 @@ def test_aggregate_to_candles():
     assert c2.high == 120.0
     assert c2.low == 120.0
     assert c2.close == 120.0
-    assert c2.volume == pytest.approx(1.5)
-    assert c2.vwap == pytest.approx(120.0)
+    assert c2.volume == 1.5
+    assert c2.vwap == 120.0
+
+
+def _reference_candles(execs):
+    # the original per-Candle implementation, kept to pin exact equality
+    buckets = defaultdict(list)
+    for ex in execs:
+        buckets[ex.timestamp.replace(second=0, microsecond=0)].append(ex)
+    result = {}
+    for minute in sorted(buckets):
+        group = buckets[minute]
+        prices = [e.price for e in group]
+        sizes = [e.size for e in group]
+        v = sum(sizes)
+        vw = sum(p * s for p, s in zip(prices, sizes)) / v
+        result[minute] = Candle(minute, group[0].price, max(prices), min(prices),
+                                group[-1].price, v, vw)
+    return result
+
+
+def test_aggregate_to_candles_matches_reference_exactly():
+    rng = np.random.default_rng(7)
+    n = 200_000
+    start = datetime(2025, 6, 9, tzinfo=timezone.utc)
+    offsets = np.sort(rng.integers(0, 24 * 60_000, n))  # 24 minutes, in ms
+    prices = np.round(15_000_000 + np.cumsum(rng.normal(0, 500, n)))
+    sizes = np.round(rng.exponential(0.02, n) + 0.0001, 8)
+    execs = [Execution(i, float(prices[i]), float(sizes[i]),
+                       start + timedelta(milliseconds=int(offsets[i])))
+             for i in range(n)]
+    # newest first, as returned by bitFlyer
+    execs.reverse()
+
+    assert aggregate_to_candles(execs, last_close=0.0) == _reference_candles(execs)
+
+
+def test_aggregate_to_candles_unsorted_batch():
+    # bitFlyer returns newest first; open/close follow input order within a minute
+    batch = ExecutionBatch.from_executions([
+        Execution(3, 120.0, 1.5, datetime(
+            2025, 6, 9, 11, 11, 5, tzinfo=timezone.utc)),
+        Execution(2, 110.0, 2.0, datetime(
+            2025, 6, 9, 11, 10, 50, tzinfo=timezone.utc)),
+        Execution(1, 100.0, 1.0, datetime(
+            2025, 6, 9, 11, 10, 10, tzinfo=timezone.utc)),
+    ])
+    candles = aggregate_to_candles(batch, last_close=90.0)
+    assert list(candles.keys()) == [
+        datetime(2025, 6, 9, 11, 10, tzinfo=timezone.utc),
+        datetime(2025, 6, 9, 11, 11, tzinfo=timezone.utc),
+    ]
+    c1 = candles[datetime(2025, 6, 9, 11, 10, tzinfo=timezone.utc)]
+    assert (c1.open, c1.high, c1.low, c1.close) == (110.0, 110.0, 100.0, 100.0)
+    assert c1.volume == pytest.approx(3.0)
+    assert c1.vwap == pytest.approx((100*1 + 110*2) / 3)
+    assert type(c1.open) is float
+
+    assert aggregate_to_candles(ExecutionBatch.from_executions([]), 0.0) == {}
 
 
 def test_save_candles_to_json(tmp_path):
@@ -123,3 +214,172 @@ def test_save_candles_to_json(tmp_path):
     assert entry["close"] == 105
     assert entry["volume"] == 3.0
     assert entry["vwap"] == 105.0
+
+
+def test_candle_builder_push():
+    builder = CandleBuilder()
+    builder.push(Execution(1, 100.0, 1.0, datetime(
+        2025, 6, 9, 11, 10, 10, tzinfo=timezone.utc)))
+    builder.push(Execution(2, 110.0, 2.0, datetime(
+        2025, 6, 9, 11, 10, 50, tzinfo=timezone.utc)))
+    # the minute is still open, nothing to flush yet
+    assert builder.flush_closed() == []
+    assert builder.open_candle.close == 110.0
+
+    builder.push(Execution(3, 120.0, 1.5, datetime(
+        2025, 6, 9, 11, 11, 5, tzinfo=timezone.utc)))
+    closed = builder.flush_closed()
+    assert len(closed) == 1
+    c1 = closed[0]
+    assert c1.minute == datetime(2025, 6, 9, 11, 10, tzinfo=timezone.utc)
+    assert (c1.open, c1.high, c1.low, c1.close) == (100.0, 110.0, 100.0, 110.0)
+    assert c1.volume == pytest.approx(3.0)
+    assert c1.vwap == pytest.approx((100*1 + 110*2) / 3)
+    assert builder.flush_closed() == []
+
+    # a trade for the already closed 11:10 minute is dropped
+    builder.push(Execution(4, 999.0, 1.0, datetime(
+        2025, 6, 9, 11, 10, 59, tzinfo=timezone.utc)))
+    assert builder.late_count == 1
+
+    remaining = builder.close()
+    assert [c.minute for c in remaining] == [
+        datetime(2025, 6, 9, 11, 11, tzinfo=timezone.utc)]
+    assert remaining[0].close == 120.0
+    assert builder.open_candle is None
+
+
+def test_candle_builder_push_batch_matches_aggregate(sample_json_file):
+    batch = load_execution_batch_from_json(sample_json_file)
+    builder = CandleBuilder()
+    # feed the same data in two slices that split the 11:10 minute
+    builder.push_batch(batch.to_executions()[:1])
+    builder.push_batch(batch.to_executions()[1:])
+    streamed = builder.close()
+
+    expected = aggregate_to_candles(batch, last_close=0.0)
+    assert [c.minute for c in streamed] == list(expected.keys())
+    for got, want in zip(streamed, expected.values()):
+        assert (got.open, got.high, got.low, got.close) == (
+            want.open, want.high, want.low, want.close)
+        assert got.volume == pytest.approx(want.volume)
+        assert got.vwap == pytest.approx(want.vwap)
+
+
+def test_aggregate_to_candles_fill_gaps():
+    execs = [
+        Execution(1, 100.0, 1.0, datetime(
+            2025, 6, 9, 11, 10, 10, tzinfo=timezone.utc)),
+        Execution(2, 130.0, 2.0, datetime(
+            2025, 6, 9, 11, 13, 0, tzinfo=timezone.utc)),
+    ]
+    candles = aggregate_to_candles(execs, last_close=90.0, fill_gaps=True)
+    assert [m.minute for m in candles.keys()] == [10, 11, 12, 13]
+
+    # empty minutes are flat at the previous close with zero volume
+    gap = candles[datetime(2025, 6, 9, 11, 11, tzinfo=timezone.utc)]
+    assert (gap.open, gap.high, gap.low, gap.close) == (100.0, 100.0, 100.0, 100.0)
+    assert gap.volume == 0
+    assert gap.vwap == 100.0
+
+    # leading gaps before the first trade use last_close
+    padded = fill_candle_gaps(
+        candles, 90.0, start=datetime(2025, 6, 9, 11, 9, tzinfo=timezone.utc))
+    first = padded[datetime(2025, 6, 9, 11, 9, tzinfo=timezone.utc)]
+    assert first.close == 90.0 and first.volume == 0
+
+
+def test_rollup_candles():
+    execs = [
+        Execution(1, 100.0, 1.0, datetime(
+            2025, 6, 9, 11, 3, 10, tzinfo=timezone.utc)),
+        Execution(2, 120.0, 1.0, datetime(
+            2025, 6, 9, 11, 4, 0, tzinfo=timezone.utc)),
+        Execution(3, 90.0, 2.0, datetime(
+            2025, 6, 9, 11, 6, 0, tzinfo=timezone.utc)),
+    ]
+    one_minute = aggregate_to_candles(execs, last_close=0.0, fill_gaps=True)
+    five_minute = rollup_candles(one_minute, "5m")
+    assert list(five_minute.keys()) == [
+        datetime(2025, 6, 9, 11, 0, tzinfo=timezone.utc),
+        datetime(2025, 6, 9, 11, 5, tzinfo=timezone.utc),
+    ]
+    c1 = five_minute[datetime(2025, 6, 9, 11, 0, tzinfo=timezone.utc)]
+    assert (c1.open, c1.high, c1.low, c1.close) == (100.0, 120.0, 100.0, 120.0)
+    assert c1.volume == pytest.approx(2.0)
+    assert c1.vwap == pytest.approx(110.0)
+
+    # the 11:05 bucket starts with a flat gap candle at the previous close
+    c2 = five_minute[datetime(2025, 6, 9, 11, 5, tzinfo=timezone.utc)]
+    assert (c2.open, c2.high, c2.low, c2.close) == (120.0, 120.0, 90.0, 90.0)
+    assert c2.vwap == pytest.approx(90.0)
+
+    daily = rollup_candles(one_minute, "1d")
+    assert list(daily.keys()) == [datetime(2025, 6, 9, tzinfo=timezone.utc)]
+    assert daily[datetime(2025, 6, 9, tzinfo=timezone.utc)].volume == pytest.approx(4.0)
+
+    with pytest.raises(ValueError):
+        rollup_candles(one_minute, "7m")
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_iter_execution_records(sample_json_file, chunk_size):
+    # tiny chunks force objects to straddle read boundaries
+    records = list(iter_execution_records(sample_json_file, chunk_size=chunk_size))
+    assert records == SAMPLE_EXEC_JSON
+
+
+def test_iter_execution_batches_ndjson(tmp_path):
+    p = tmp_path / "sample_exec.ndjson"
+    p.write_text("\n".join(json.dumps(item) for item in SAMPLE_EXEC_JSON) + "\n")
+
+    batches = list(iter_execution_batches(str(p), batch_size=2, chunk_size=16))
+    assert [len(b) for b in batches] == [2, 1]
+    assert [i for b in batches for i in b.id.tolist()] == [1, 2, 3]
+
+
+def test_aggregate_batches_to_candles(sample_json_file):
+    streamed = aggregate_batches_to_candles(
+        iter_execution_batches(sample_json_file, batch_size=1), last_close=0.0)
+    expected = aggregate_to_candles(
+        load_executions_from_json(sample_json_file), last_close=0.0)
+    assert list(streamed.keys()) == list(expected.keys())
+    for minute, want in expected.items():
+        got = streamed[minute]
+        assert (got.open, got.high, got.low, got.close) == (
+            want.open, want.high, want.low, want.close)
+        assert got.volume == pytest.approx(want.volume)
+        assert got.vwap == pytest.approx(want.vwap)
+
+
+def test_executions_archive_roundtrip(sample_json_file, tmp_path):
+    batch = load_execution_batch_from_json(sample_json_file)
+    archive_file = str(tmp_path / "exec.bin")
+    save_executions_to_archive(batch, archive_file)
+
+    mapped = load_executions_from_archive(archive_file)
+    assert len(mapped) == len(batch)
+    for name in ("id", "price", "size", "timestamp_ns"):
+        assert getattr(mapped, name).tolist() == getattr(batch, name).tolist()
+    # columns are read-only views onto the mapped file
+    assert not mapped.price.flags.writeable
+
+    # archive -> JSON is readable by the JSON loader again
+    json_file = str(tmp_path / "exec.json")
+    convert_executions_archive_to_json(archive_file, json_file)
+    assert load_executions_from_json(json_file) == batch.to_executions()
+
+    with pytest.raises(ValueError):
+        load_candles_from_archive(archive_file)
+
+
+def test_candles_archive_roundtrip(sample_json_file, tmp_path):
+    candles = aggregate_to_candles(
+        load_execution_batch_from_json(sample_json_file), last_close=0.0)
+    archive_file = str(tmp_path / "candles.bin")
+    save_candles_to_archive(candles, archive_file)
+    assert load_candles_from_archive(archive_file) == candles
+
+    json_file = str(tmp_path / "candles.json")
+    convert_candles_archive_to_json(archive_file, json_file)
+    assert load_candles_from_json(json_file) == candles
@@ -1,5 +1,11 @@
 import os
-import json
+import io
+import re
+import time
+import argparse
+import itertools
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
 from sqlalchemy import (
     Column,
     BigInteger,
@@ -9,9 +15,12 @@ from sqlalchemy import (
     Date,
     text
 )
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.schema import PrimaryKeyConstraint
-from utils import get_logger, get_db
+from utils import (
+    PRICE_BUCKET_TICK, get_logger, get_db, exec_date_to_ns, ns_to_datetime, iter_json_records,
+)
 
 OUTPUT_DIR = "./output"
 script_base = os.path.splitext(os.path.basename(__file__))[0]
@@ -21,6 +30,100 @@ exercises_02_filename = os.path.join(OUTPUT_DIR, "exercises_02_candles.json")
 log_filename = f"{script_base}.log"
 logger = get_logger(log_filename=log_filename)
 
+BATCH_SIZE = 50_000            # Rows per COPY / executemany batch
+
+EXECUTION_COLUMNS = (
+    "id", "side", "price", "size", "exec_date",
+    "buy_child_order_acceptance_id", "sell_child_order_acceptance_id",
+)
+CANDLE_COLUMNS = ("minute", "open", "high", "low", "close", "volume", "vwap")
+
+DEFAULT_PRODUCT_CODE = "BTC_JPY"  # Product of the executions file loaded by main()
+
+# Merge of a staged executions batch: insert the new rows and fold exactly
+# those rows (RETURNING skips duplicates) into daily_stats and the
+# price_volume_buckets histogram in one statement.
+# Placeholders: {cols}, {staging}; parameters: product_code, price_tick.
+EXECUTIONS_MERGE_SQL = """
+    WITH inserted AS (
+        INSERT INTO executions (product_code, {cols})
+        SELECT %(product_code)s, {cols} FROM {staging}
+        ON CONFLICT DO NOTHING
+        RETURNING id, price, size, exec_date, day
+    ),
+    batch AS (
+        SELECT
+            day,
+            MAX(price) AS high,
+            MIN(price) AS low,
+            (array_agg(price ORDER BY exec_date, id))[1] AS open,
+            (array_agg(price ORDER BY exec_date DESC, id DESC))[1] AS close,
+            SUM(size) AS volume,
+            COUNT(*) AS trade_count,
+            (array_agg(exec_date ORDER BY exec_date, id))[1] AS first_exec_date,
+            (array_agg(id ORDER BY exec_date, id))[1] AS first_id,
+            (array_agg(exec_date ORDER BY exec_date DESC, id DESC))[1] AS last_exec_date,
+            (array_agg(id ORDER BY exec_date DESC, id DESC))[1] AS last_id
+        FROM inserted
+        GROUP BY day
+    ),
+    stats AS (
+        INSERT INTO daily_stats (
+            day, product_code, high, low, open, close, volume, trade_count,
+            first_exec_date, first_id, last_exec_date, last_id
+        )
+        SELECT
+            day, %(product_code)s, high, low, open, close, volume, trade_count,
+            first_exec_date, first_id, last_exec_date, last_id
+        FROM batch
+        ON CONFLICT (day, product_code) DO UPDATE SET
+            high = GREATEST(daily_stats.high, EXCLUDED.high),
+            low = LEAST(daily_stats.low, EXCLUDED.low),
+            open = CASE
+                WHEN (EXCLUDED.first_exec_date, EXCLUDED.first_id)
+                   < (daily_stats.first_exec_date, daily_stats.first_id)
+                THEN EXCLUDED.open ELSE daily_stats.open END,
+            first_exec_date = CASE
+                WHEN (EXCLUDED.first_exec_date, EXCLUDED.first_id)
+                   < (daily_stats.first_exec_date, daily_stats.first_id)
+                THEN EXCLUDED.first_exec_date ELSE daily_stats.first_exec_date END,
+            first_id = CASE
+                WHEN (EXCLUDED.first_exec_date, EXCLUDED.first_id)
+                   < (daily_stats.first_exec_date, daily_stats.first_id)
+                THEN EXCLUDED.first_id ELSE daily_stats.first_id END,
+            close = CASE
+                WHEN (EXCLUDED.last_exec_date, EXCLUDED.last_id)
+                   > (daily_stats.last_exec_date, daily_stats.last_id)
+                THEN EXCLUDED.close ELSE daily_stats.close END,
+            last_exec_date = CASE
+                WHEN (EXCLUDED.last_exec_date, EXCLUDED.last_id)
+                   > (daily_stats.last_exec_date, daily_stats.last_id)
+                THEN EXCLUDED.last_exec_date ELSE daily_stats.last_exec_date END,
+            last_id = CASE
+                WHEN (EXCLUDED.last_exec_date, EXCLUDED.last_id)
+                   > (daily_stats.last_exec_date, daily_stats.last_id)
+                THEN EXCLUDED.last_id ELSE daily_stats.last_id END,
+            volume = daily_stats.volume + EXCLUDED.volume,
+            trade_count = daily_stats.trade_count + EXCLUDED.trade_count,
+            updated_at = now()
+    ),
+    buckets AS (
+        INSERT INTO price_volume_buckets (day, product_code, bucket, volume)
+        SELECT day, %(product_code)s, price - mod(price, %(price_tick)s), SUM(size)
+        FROM inserted
+        GROUP BY 1, 3
+        ON CONFLICT (day, product_code, bucket) DO UPDATE SET
+            volume = price_volume_buckets.volume + EXCLUDED.volume
+    )
+    SELECT COUNT(*) FROM inserted
+"""
+
+# Partition management for the executions table
+PARTITION_GRANULARITY = os.getenv("PARTITION_GRANULARITY", "month")  # "day" or "month"
+PARTITION_LOOKAHEAD = int(os.getenv("PARTITION_LOOKAHEAD", "1"))      # Extra partitions created ahead
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))               # 0 keeps every partition
+RETENTION_DROP = os.getenv("RETENTION_DROP", "0") == "1"             # Drop instead of only detaching
+
 # Define the SQLAlchemy ORM base class
 Base = declarative_base()
 
@@ -29,6 +132,7 @@ Base = declarative_base()
 
 class Execution(Base):
     __tablename__ = "executions"
+    product_code = Column(Text, nullable=False)
     id = Column(BigInteger, nullable=False)
     side = Column(Text, nullable=False)
     price = Column(Numeric(20, 8), nullable=False)
@@ -39,7 +143,7 @@ class Execution(Base):
     # This is a generated column in SQL, not used by ORM
     day = Column(Date, nullable=False)
     __table_args__ = (
-        PrimaryKeyConstraint('id', 'exec_date', name='executions_pkey'),
+        PrimaryKeyConstraint('product_code', 'id', 'exec_date', name='executions_pkey'),
     )
 
 # ORM model for the candles table
@@ -57,30 +161,490 @@ class Candle(Base):
     # This is a generated column in SQL, not used by ORM
     day = Column(Date, nullable=False)
 
+# ORM model for the daily_stats summary table
+
+
+class DailyStats(Base):
+    __tablename__ = "daily_stats"
+    day = Column(Date, nullable=False)
+    product_code = Column(Text, nullable=False)
+    high = Column(Numeric(20, 8), nullable=False)
+    low = Column(Numeric(20, 8), nullable=False)
+    open = Column(Numeric(20, 8), nullable=False)
+    close = Column(Numeric(20, 8), nullable=False)
+    volume = Column(Numeric(28, 8), nullable=False)
+    trade_count = Column(BigInteger, nullable=False)
+    first_exec_date = Column(DateTime(timezone=True), nullable=False)
+    first_id = Column(BigInteger, nullable=False)
+    last_exec_date = Column(DateTime(timezone=True), nullable=False)
+    last_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint('day', 'product_code', name='daily_stats_pkey'),
+    )
+
+# ORM model for the price_volume_buckets histogram table
+
+
+class PriceVolumeBucket(Base):
+    __tablename__ = "price_volume_buckets"
+    day = Column(Date, nullable=False)
+    product_code = Column(Text, nullable=False)
+    bucket = Column(Numeric(20, 8), nullable=False)
+    volume = Column(Numeric(28, 8), nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint('day', 'product_code', 'bucket', name='price_volume_buckets_pkey'),
+    )
+
+
+def execution_rows(records: Iterable[dict]) -> Iterator[tuple]:
+    """
+    Convert raw bitFlyer execution dicts into EXECUTION_COLUMNS tuples.
+    """
+    for row in records:
+        yield (
+            row["id"],
+            row["side"],
+            row["price"],
+            row["size"],
+            # Decode to a tz-aware UTC datetime (naive bitFlyer dates are UTC)
+            ns_to_datetime(exec_date_to_ns(row["exec_date"])),
+            row.get("buy_child_order_acceptance_id"),
+            row.get("sell_child_order_acceptance_id"),
+        )
+
+
+def candle_rows(records: Iterable[dict]) -> Iterator[tuple]:
+    """
+    Convert candle dicts from exercises_02 into CANDLE_COLUMNS tuples.
+    """
+    for row in records:
+        yield tuple(row[col] for col in CANDLE_COLUMNS)
+
+
+def _copy_value(value) -> str:
+    """Render one value in PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class CopyStream(io.TextIOBase):
+    """
+    File-like object that renders rows to COPY text lazily as psycopg2
+    reads it, so a batch is never materialized as one big string.
+    """
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self._rows = iter(rows)
+        self._buf = ""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buf += "\t".join(_copy_value(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self._buf)
+        out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def _copy_batch(engine, table: str, columns: Sequence[str], rows: Iterable[Sequence],
+                merge_sql: Optional[str] = None, merge_params: Optional[dict] = None) -> tuple:
+    """
+    COPY one batch into a temporary staging table, then merge it into the
+    target in the same transaction: with INSERT ... ON CONFLICT DO NOTHING,
+    or with merge_sql (a template over {cols} and {staging} that returns the
+    number of inserted rows). Returns (rows read, rows inserted).
+    """
+    cols = ", ".join(columns)
+    stream = CopyStream(rows)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(
+            f"CREATE TEMP TABLE staging_{table} ON COMMIT DROP AS "
+            f"SELECT {cols} FROM {table} WITH NO DATA")
+        cur.copy_expert(f"COPY staging_{table} ({cols}) FROM STDIN", stream)
+        if merge_sql is None:
+            cur.execute(
+                f"INSERT INTO {table} ({cols}) SELECT {cols} FROM staging_{table} "
+                f"ON CONFLICT DO NOTHING")
+            inserted = cur.rowcount
+        else:
+            cur.execute(merge_sql.format(cols=cols, staging=f"staging_{table}"),
+                        merge_params or {})
+            inserted = cur.fetchone()[0]
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return stream.count, inserted
+
+
+def _executemany_batch(engine, table: str, columns: Sequence[str], rows: Iterable[Sequence],
+                       merge_sql: Optional[str] = None, merge_params: Optional[dict] = None) -> tuple:
+    """
+    Fallback for backends without COPY: one executemany INSERT per batch.
+    merge_sql is PostgreSQL-specific, so a load that needs one is refused
+    rather than written without it. Returns (rows read, rows inserted).
+    """
+    if merge_sql is not None:
+        raise ValueError(f"Loading {table} needs PostgreSQL: its merge cannot run "
+                         f"on {engine.dialect.name}")
+    params = [dict(zip(columns, row)) for row in rows]
+    if not params:
+        return 0, 0
+    stmt = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + c for c in columns)}) ON CONFLICT DO NOTHING")
+    with engine.begin() as conn:
+        result = conn.execute(stmt, params)
+    return len(params), result.rowcount
+
 
-def load_json(filename):
-    """Load JSON data from a file."""
-    with open(filename, "r") as f:
-        return json.load(f)
+_PARTITION_NAME = re.compile(r"^executions_(\d{4})_(\d{2})(?:_(\d{2}))?$")
+
+
+def _next_bound(lower: date, granularity: str) -> date:
+    if granularity == "day":
+        return lower + timedelta(days=1)
+    if granularity == "month":
+        return date(lower.year + lower.month // 12, lower.month % 12 + 1, 1)
+    raise ValueError(f"Unsupported partition granularity {granularity!r}")
+
+
+def partition_name(lower: date, granularity: str) -> str:
+    """executions_YYYY_MM for monthly partitions, executions_YYYY_MM_DD for daily ones."""
+    if granularity == "day":
+        return f"executions_{lower:%Y_%m_%d}"
+    return f"executions_{lower:%Y_%m}"
+
+
+def partition_range(name: str) -> Optional[Tuple[date, date]]:
+    """
+    Recover the [lower, upper) UTC date range from a partition name, or None
+    for tables that do not follow the naming scheme.
+    """
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    if day is None:
+        lower = date(int(year), int(month), 1)
+        return lower, _next_bound(lower, "month")
+    lower = date(int(year), int(month), int(day))
+    return lower, _next_bound(lower, "day")
+
+
+def partition_bounds(start: datetime, end: datetime, granularity: str = PARTITION_GRANULARITY,
+                     lookahead: int = PARTITION_LOOKAHEAD) -> List[Tuple[str, date, date]]:
+    """
+    Partitions (name, lower, upper) covering start..end in UTC, plus
+    `lookahead` further partitions so ingest near a boundary never waits
+    on DDL.
+    """
+    first = start.astimezone(timezone.utc).date()
+    last = end.astimezone(timezone.utc).date()
+    lower = first.replace(day=1) if granularity == "month" else first
+    bounds = []
+    extra = 0
+    while lower <= last or extra < lookahead:
+        if lower > last:
+            extra += 1
+        upper = _next_bound(lower, granularity)
+        bounds.append((partition_name(lower, granularity), lower, upper))
+        lower = upper
+    return bounds
+
+
+# Partitions known to exist, so batches inside the same range skip the DDL
+_known_partitions = set()
+
+# SQLSTATE of "partition ... would overlap partition ..."
+PG_INVALID_OBJECT_DEFINITION = "42P17"
+
+
+def ensure_partitions(conn, start: datetime, end: datetime, granularity: str = PARTITION_GRANULARITY,
+                      lookahead: int = PARTITION_LOOKAHEAD) -> List[str]:
+    """
+    Create the executions partitions covering start..end (plus lookahead).
+    A range already covered by another partition (e.g. a monthly one while
+    running daily) is skipped; any other DDL failure propagates and the
+    partition is retried by the next call. Returns the names of newly
+    created partitions.
+    """
+    created = []
+    for name, lower, upper in partition_bounds(start, end, granularity, lookahead):
+        if name in _known_partitions:
+            continue
+        try:
+            with conn.begin_nested():
+                result = conn.execute(text(
+                    "SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+                if not result.scalar():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF executions "
+                        f"FOR VALUES FROM ('{lower} 00:00:00+00') TO ('{upper} 00:00:00+00')"))
+                    created.append(name)
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) != PG_INVALID_OBJECT_DEFINITION:
+                raise
+            # "would overlap partition": the range is already covered
+            logger.warning("Skipping partition %s: %s", name, e.orig)
+        _known_partitions.add(name)
+    if created:
+        logger.info("Created partitions: %s", ", ".join(created))
+        ensure_partition_indexes(conn)
+    return created
+
+
+# Partitioned indexes of executions that every partition must carry:
+# parent index -> (suffix of the partition's index, columns)
+PARTITION_INDEXES = {
+    "idx_executions_day_price": ("day_price_idx", "day, price"),
+    "idx_executions_product_price": ("product_price_idx", "product_code, price, day"),
+}
+
+
+def ensure_partition_indexes(conn):
+    """
+    Make sure every attached partition carries its part of each index in
+    PARTITION_INDEXES. PostgreSQL cascades the indexes to partitions it
+    creates, but a table attached later may lack them; build and attach them.
+    """
+    for index, (suffix, columns) in PARTITION_INDEXES.items():
+        missing = conn.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'executions'::regclass
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM pg_inherits ii
+                  JOIN pg_index x ON x.indexrelid = ii.inhrelid
+                  WHERE ii.inhparent = CAST(:index AS regclass)
+                    AND x.indrelid = c.oid
+              )
+        """), {"index": index}).scalars().all()
+        for name in missing:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name}_{suffix} ON {name} ({columns})"))
+            conn.execute(text(f"ALTER INDEX {index} ATTACH PARTITION {name}_{suffix}"))
+            logger.info("Attached %s to %s", index, name)
+
+
+def apply_retention(conn, keep_days: int = RETENTION_DAYS, drop: bool = RETENTION_DROP,
+                    today: Optional[date] = None) -> List[str]:
+    """
+    Detach (and optionally drop) executions partitions whose whole range is
+    older than keep_days. Detached tables keep their data for archiving but
+    are invisible to queries on executions, so the planner never scans them.
+    Returns the affected partition names.
+    """
+    if keep_days <= 0:
+        return []
+    cutoff = (today or datetime.now(timezone.utc).date()) - timedelta(days=keep_days)
+    names = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'executions'::regclass
+    """)).scalars().all()
+
+    expired = []
+    for name in sorted(names):
+        bounds = partition_range(name)
+        if bounds is None or bounds[1] > cutoff:
+            continue
+        conn.execute(text(f"ALTER TABLE executions DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+        _known_partitions.discard(name)
+        expired.append(name)
+    if expired:
+        logger.info("%s expired partitions: %s",
+                    "Dropped" if drop else "Detached", ", ".join(expired))
+    return expired
+
+
+def prepare_execution_partitions(engine, batch: Sequence[Sequence]):
+    """
+    bulk_load hook: create the partitions a batch of execution rows needs
+    before it is copied in, so ingest never fails on a missing partition.
+    """
+    idx = EXECUTION_COLUMNS.index("exec_date")
+    dates = [row[idx] for row in batch]
+    with engine.begin() as conn:
+        ensure_partitions(conn, min(dates), max(dates))
+
+
+def load_executions(engine, rows: Iterable[Sequence], product_code: str = DEFAULT_PRODUCT_CODE,
+                    batch_size: int = BATCH_SIZE) -> int:
+    """
+    Bulk load execution rows, creating partitions on demand and keeping
+    daily_stats and price_volume_buckets current with every batch.
+    PostgreSQL only: the rows get their product_code and are folded into
+    the summaries by EXECUTIONS_MERGE_SQL, which other backends cannot run.
+    """
+    if engine.dialect.name != "postgresql":
+        raise ValueError(f"load_executions needs PostgreSQL, not {engine.dialect.name}")
+    return bulk_load(engine, "executions", EXECUTION_COLUMNS, rows, batch_size,
+                     prepare=prepare_execution_partitions,
+                     merge_sql=EXECUTIONS_MERGE_SQL,
+                     merge_params={"product_code": product_code,
+                                   "price_tick": PRICE_BUCKET_TICK})
+
+
+def rebuild_daily_stats(conn, product_code: str = DEFAULT_PRODUCT_CODE):
+    """
+    Recompute daily_stats and price_volume_buckets from scratch from the
+    executions table, e.g. after loading data outside load_executions or
+    changing PRICE_BUCKET_TICK.
+    """
+    conn.execute(text("DELETE FROM daily_stats WHERE product_code = :product_code"),
+                 {"product_code": product_code})
+    conn.execute(text("""
+        INSERT INTO daily_stats (
+            day, product_code, high, low, open, close, volume, trade_count,
+            first_exec_date, first_id, last_exec_date, last_id
+        )
+        SELECT
+            day, :product_code,
+            MAX(price), MIN(price),
+            (array_agg(price ORDER BY exec_date, id))[1],
+            (array_agg(price ORDER BY exec_date DESC, id DESC))[1],
+            SUM(size), COUNT(*),
+            MIN(exec_date), (array_agg(id ORDER BY exec_date, id))[1],
+            MAX(exec_date), (array_agg(id ORDER BY exec_date DESC, id DESC))[1]
+        FROM executions
+        WHERE product_code = :product_code
+        GROUP BY day
+    """), {"product_code": product_code})
+    conn.execute(text("DELETE FROM price_volume_buckets WHERE product_code = :product_code"),
+                 {"product_code": product_code})
+    conn.execute(text("""
+        INSERT INTO price_volume_buckets (day, product_code, bucket, volume)
+        SELECT day, :product_code, price - mod(price, :price_tick), SUM(size)
+        FROM executions
+        WHERE product_code = :product_code
+        GROUP BY 1, 3
+    """), {"product_code": product_code, "price_tick": PRICE_BUCKET_TICK})
+
+
+def bulk_load(engine, table: str, columns: Sequence[str], rows: Iterable[Sequence],
+              batch_size: int = BATCH_SIZE,
+              prepare: Optional[Callable[..., None]] = None,
+              merge_sql: Optional[str] = None, merge_params: Optional[dict] = None) -> int:
+    """
+    Load rows into table in batches of batch_size, using COPY FROM STDIN on
+    PostgreSQL and executemany elsewhere. Rows are pulled lazily from the
+    iterable, one batch at a time; prepare(engine, batch) runs before each
+    batch is written and merge_sql replaces the default staging merge (see
+    _copy_batch). Logs throughput per batch and returns the number of rows
+    read.
+    """
+    load_batch = _copy_batch if engine.dialect.name == "postgresql" else _executemany_batch
+    rows = iter(rows)
+    total = inserted = 0
+    start = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        if prepare is not None:
+            prepare(engine, batch)
+        read, added = load_batch(engine, table, columns, batch, merge_sql, merge_params)
+        total += read
+        inserted += added
+        elapsed = time.perf_counter() - start
+        logger.info("Loaded %d rows into %s (%d new, %.0f rows/s)",
+                    total, table, inserted, total / elapsed if elapsed else 0.0)
+    return total
+
+
+def init_schema(engine, sql_path: str = "exercises_03.sql"):
+    """
+    (Re)create the schema by executing the statements of sql_path. The
+    script drops executions and its partitions, so the cache of known
+    partitions is cleared as well.
+    """
+    logger.info(f"Reading SQL schema from {sql_path}")
+    with open(sql_path, 'r', encoding='utf-8') as f:
+        sql_script = f.read()
+    logger.info(
+        f"Executing SQL script from {sql_path}: {sql_script[:100]}...")
+    with engine.connect() as connection:
+        for statement in sql_script.split(';'):
+            stmt = statement.strip()
+            if stmt:
+                logger.info(f"Executing SQL statement: {stmt[:80]}...")
+                connection.execute(text(stmt))
+        connection.commit()
+    _known_partitions.clear()
+
+
+# Upgrade of an executions table created before it had a product_code
+# column (every earlier load was BTC_JPY). The constant default fills the
+# existing rows without rewriting them; it is dropped again so the loader
+# has to name the product. Execution ids are only unique per product, so the
+# primary key is rebuilt to include it.
+EXECUTIONS_PRODUCT_CODE_MIGRATION = (
+    f"ALTER TABLE executions ADD COLUMN product_code TEXT NOT NULL DEFAULT '{DEFAULT_PRODUCT_CODE}'",
+    "ALTER TABLE executions ALTER COLUMN product_code DROP DEFAULT",
+    "ALTER TABLE executions DROP CONSTRAINT executions_pkey",
+    "ALTER TABLE executions ADD CONSTRAINT executions_pkey PRIMARY KEY (product_code, id, exec_date)",
+    "CREATE INDEX IF NOT EXISTS idx_executions_product_price ON executions(product_code, price, day)",
+)
+
+
+def migrate_schema(engine) -> bool:
+    """
+    Bring a database initialized by an older exercises_03.sql up to date
+    without dropping its data: add executions.product_code and rebuild the
+    primary key (see EXECUTIONS_PRODUCT_CODE_MIGRATION), in one transaction.
+    Returns False if the schema is already current.
+    """
+    with engine.begin() as conn:
+        current = conn.execute(text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'executions' AND column_name = 'product_code'
+        """)).first()
+        if current:
+            return False
+        for statement in EXECUTIONS_PRODUCT_CODE_MIGRATION:
+            logger.info(f"Executing SQL statement: {statement[:80]}...")
+            conn.execute(text(statement))
+    logger.info("Migrated executions to per-product primary keys")
+    return True
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Initialize the schema and load the exercise data.")
+    parser.add_argument("--migrate", action="store_true",
+                        help="upgrade an existing database in place (keeps its data) and exit")
+    args = parser.parse_args()
     engine = get_db()
 
+    if args.migrate:
+        if not migrate_schema(engine):
+            logger.info("Schema is already up to date")
+        return
+
     # 1. Initialize database schema from SQL file
     try:
-        logger.info("Reading SQL schema from exercises_03.sql")
-        with open('exercises_03.sql', 'r') as f:
-            sql_script = f.read()
-        logger.info(
-            f"Executing SQL script from exercises_03.sql: {sql_script[:100]}...")
-        with engine.connect() as connection:
-            for statement in sql_script.split(';'):
-                stmt = statement.strip()
-                if stmt:
-                    logger.info(f"Executing SQL statement: {stmt[:80]}...")
-                    connection.execute(text(stmt))
-            connection.commit()
+        init_schema(engine)
         logger.info(
             "✅ Database schema initialized from exercises_03.sql successfully.")
     except Exception as e:
@@ -88,73 +652,23 @@ def main():
             f"❌ Error initializing database from exercises_03.sql: {e}")
         return
 
-    # 2. Insert executions data from JSON file
+    # 1.1 Retire partitions past the retention window
+    with engine.begin() as conn:
+        apply_retention(conn)
+
+    # 2. Bulk load executions data from JSON file
     try:
         logger.info(f"Loading executions data from {exercises_01_filename}")
-        executions = load_json(exercises_01_filename)
-        logger.info(f"Loaded {len(executions)} executions records.")
-        with engine.begin() as conn:
-            for row in executions:
-                exec_date = row["exec_date"]
-                # Ensure exec_date has timezone info
-                if "+" not in exec_date:
-                    exec_date += "+00:00"
-                logger.info(
-                    f"Inserting execution id={row['id']} exec_date={exec_date}")
-                conn.execute(
-                    text("""
-                        INSERT INTO executions (
-                            id, side, price, size, exec_date,
-                            buy_child_order_acceptance_id,
-                            sell_child_order_acceptance_id
-                        ) VALUES (
-                            :id, :side, :price, :size, :exec_date,
-                            :buy_child_order_acceptance_id,
-                            :sell_child_order_acceptance_id
-                        )
-                        ON CONFLICT DO NOTHING
-                    """),
-                    {
-                        "id": row["id"],
-                        "side": row["side"],
-                        "price": row["price"],
-                        "size": row["size"],
-                        "exec_date": exec_date,
-                        "buy_child_order_acceptance_id": row.get("buy_child_order_acceptance_id"),
-                        "sell_child_order_acceptance_id": row.get("sell_child_order_acceptance_id"),
-                    }
-                )
+        load_executions(engine, execution_rows(iter_json_records(exercises_01_filename)))
         logger.info("✅ Inserted executions data.")
     except Exception as e:
         logger.error(f"❌ Error inserting executions: {e}")
 
-    # 3. Insert candles data from JSON file
+    # 3. Bulk load candles data from JSON file
     try:
         logger.info(f"Loading candles data from {exercises_02_filename}")
-        candles = load_json(exercises_02_filename)
-        logger.info(f"Loaded {len(candles)} candles records.")
-        with engine.begin() as conn:
-            for row in candles:
-                logger.info(f"Inserting candle minute={row['minute']}")
-                conn.execute(
-                    text("""
-                        INSERT INTO candles (
-                            minute, open, high, low, close, volume, vwap
-                        ) VALUES (
-                            :minute, :open, :high, :low, :close, :volume, :vwap
-                        )
-                        ON CONFLICT DO NOTHING
-                    """),
-                    {
-                        "minute": row["minute"],
-                        "open": row["open"],
-                        "high": row["high"],
-                        "low": row["low"],
-                        "close": row["close"],
-                        "volume": row["volume"],
-                        "vwap": row["vwap"],
-                    }
-                )
+        bulk_load(engine, "candles", CANDLE_COLUMNS,
+                  candle_rows(iter_json_records(exercises_02_filename)))
         logger.info("✅ Inserted candles data.")
     except Exception as e:
         logger.error(f"❌ Error inserting candles: {e}")
@@ -9,6 +9,7 @@ DROP TABLE IF EXISTS executions CASCADE;
 
 -- Create parent table for executions, partitioned by exec_date
 CREATE TABLE executions (
+    product_code        TEXT              NOT NULL,
     id                  BIGINT            NOT NULL,
     side                TEXT              NOT NULL CHECK (side IN ('BUY','SELL')),
     price               NUMERIC(20,8)     NOT NULL,
@@ -20,11 +21,13 @@ CREATE TABLE executions (
     -- Persisted UTC date for each execution, to speed up daily grouping
     day DATE GENERATED ALWAYS AS ((exec_date AT TIME ZONE 'UTC')::date) STORED,
 
-    PRIMARY KEY (id, exec_date)
+    -- Execution ids are only unique within a product
+    PRIMARY KEY (product_code, id, exec_date)
 ) PARTITION BY RANGE (exec_date);
 
 -- Create a partition for June 2025
--- (In production you would script creation of each future partition)
+-- (Further partitions are created on demand by the loader's partition
+--  manager in exercises_03.py, which also applies the retention policy)
 CREATE TABLE IF NOT EXISTS executions_2025_06
   PARTITION OF executions
   FOR VALUES FROM ('2025-06-01 00:00:00+00') TO ('2025-07-01 00:00:00+00');
@@ -41,6 +44,12 @@ CREATE INDEX IF NOT EXISTS idx_executions_exec_date
 CREATE INDEX IF NOT EXISTS idx_executions_day_price
   ON executions(day, price);
 
+-- Composite index for price-range scans of one product (the boundary bucket
+-- of /daily-volume-by-price): a narrow price range reads only its own rows,
+-- whatever the number of days
+CREATE INDEX IF NOT EXISTS idx_executions_product_price
+  ON executions(product_code, price, day);
+
 
 
 
@@ -72,3 +81,55 @@ CREATE TABLE candles (
 -- Speed up queries grouped by day
 CREATE INDEX IF NOT EXISTS idx_candles_day
   ON candles(day);
+
+
+-- ===============================================================
+-- 3. Create the daily_stats summary table
+-- ===============================================================
+
+-- Drop existing table if any
+DROP TABLE IF EXISTS daily_stats;
+
+-- Per-day, per-product summary maintained by the loader on every ingest
+-- batch, so daily analytics never have to scan raw executions
+CREATE TABLE daily_stats (
+    day             DATE           NOT NULL,
+    product_code    TEXT           NOT NULL,
+    high            NUMERIC(20,8)  NOT NULL,               -- highest price
+    low             NUMERIC(20,8)  NOT NULL,               -- lowest price
+    open            NUMERIC(20,8)  NOT NULL,               -- first trade price
+    close           NUMERIC(20,8)  NOT NULL,               -- last trade price
+    volume          NUMERIC(28,8)  NOT NULL,               -- total traded size
+    trade_count     BIGINT         NOT NULL,               -- number of executions
+
+    -- Ordering keys of the open/close trades, used for incremental merges
+    first_exec_date TIMESTAMPTZ    NOT NULL,
+    first_id        BIGINT         NOT NULL,
+    last_exec_date  TIMESTAMPTZ    NOT NULL,
+    last_id         BIGINT         NOT NULL,
+
+    updated_at      TIMESTAMPTZ    NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (day, product_code)
+);
+
+
+-- ===============================================================
+-- 4. Create the price_volume_buckets histogram table
+-- ===============================================================
+
+-- Drop existing table if any
+DROP TABLE IF EXISTS price_volume_buckets;
+
+-- Per-day volume-at-price histogram with fixed-width buckets
+-- (PRICE_BUCKET_TICK), maintained by the loader together with daily_stats.
+-- A price threshold query sums the buckets above the threshold's bucket
+-- through the primary key and corrects the boundary bucket from executions.
+CREATE TABLE price_volume_buckets (
+    day           DATE           NOT NULL,
+    product_code  TEXT           NOT NULL,
+    bucket        NUMERIC(20,8)  NOT NULL,                 -- lower bound of the bucket
+    volume        NUMERIC(28,8)  NOT NULL,                 -- traded size within the bucket
+
+    PRIMARY KEY (day, product_code, bucket)
+);
@@ -0,0 +1,322 @@
+import re
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+import exercises_03
+
+from exercises_03 import (
+    CANDLE_COLUMNS,
+    EXECUTION_COLUMNS,
+    EXECUTIONS_MERGE_SQL,
+    CopyStream,
+    bulk_load,
+    candle_rows,
+    ensure_partitions,
+    execution_rows,
+    init_schema,
+    load_executions,
+    partition_bounds,
+    partition_range,
+)
+from exercises_04_loadtest import synthetic_executions
+from utils import price_bucket
+
+SAMPLE_EXECUTIONS = [
+    {
+        "id": 1,
+        "side": "BUY",
+        "price": 100.0,
+        "size": 1.0,
+        "exec_date": "2025-06-09T11:10:10.000",
+        "buy_child_order_acceptance_id": "JRF20250609-111010-000001",
+        "sell_child_order_acceptance_id": None,
+    },
+    {
+        "id": 2,
+        "side": "SELL",
+        "price": 110.0,
+        "size": 2.0,
+        "exec_date": "2025-06-09T11:10:50.5",
+        "buy_child_order_acceptance_id": "tab\there",
+        "sell_child_order_acceptance_id": "back\\slash",
+    },
+]
+
+
+def test_execution_rows():
+    rows = list(execution_rows(SAMPLE_EXECUTIONS))
+    assert rows[0][:4] == (1, "BUY", 100.0, 1.0)
+    assert rows[1][4] == datetime(2025, 6, 9, 11, 10, 50, 500000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("size", [-1, 5, 8192])
+def test_copy_stream_text_format(size):
+    stream = CopyStream(execution_rows(SAMPLE_EXECUTIONS))
+    chunks = []
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    lines = "".join(chunks).split("\n")
+    assert stream.count == 2
+    assert lines[0] == ("1\tBUY\t100.0\t1.0\t2025-06-09T11:10:10+00:00\t"
+                        "JRF20250609-111010-000001\t\\N")
+    # tabs and backslashes inside values are escaped
+    assert lines[1].endswith("\ttab\\there\tback\\\\slash")
+    assert lines[2] == ""
+
+
+SAMPLE_CANDLES = [
+    {"minute": "2025-06-09T11:10:00+00:00", "open": 100.0, "high": 101.0,
+     "low": 99.0, "close": 100.5, "volume": 1.5, "vwap": 100.2},
+    {"minute": "2025-06-09T11:11:00+00:00", "open": 100.5, "high": 102.0,
+     "low": 100.0, "close": 101.0, "volume": 0.5, "vwap": 101.1},
+]
+
+
+def test_bulk_load_executemany_fallback():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE candles (
+                minute TEXT NOT NULL PRIMARY KEY,
+                open NUMERIC NOT NULL, high NUMERIC NOT NULL, low NUMERIC NOT NULL,
+                close NUMERIC NOT NULL, volume NUMERIC NOT NULL, vwap NUMERIC NOT NULL
+            )
+        """))
+
+    loaded = bulk_load(engine, "candles", CANDLE_COLUMNS,
+                       candle_rows(SAMPLE_CANDLES), batch_size=1)
+    assert loaded == 2
+    # re-loading the same rows is a no-op thanks to ON CONFLICT DO NOTHING
+    bulk_load(engine, "candles", CANDLE_COLUMNS, candle_rows(SAMPLE_CANDLES))
+    with engine.connect() as conn:
+        opens = conn.execute(text("SELECT open FROM candles ORDER BY minute")).scalars().all()
+    assert opens == [100.0, 100.5]
+
+
+def test_executions_need_postgresql():
+    # the real column set: product_code is only supplied by the merge
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE executions (
+                product_code TEXT NOT NULL, id INTEGER NOT NULL, side TEXT NOT NULL,
+                price NUMERIC NOT NULL, size NUMERIC NOT NULL,
+                exec_date TIMESTAMP NOT NULL,
+                buy_child_order_acceptance_id TEXT,
+                sell_child_order_acceptance_id TEXT,
+                PRIMARY KEY (product_code, id, exec_date)
+            )
+        """))
+
+    with pytest.raises(ValueError, match="PostgreSQL"):
+        load_executions(engine, execution_rows(SAMPLE_EXECUTIONS))
+    # the fallback refuses a merge instead of inserting without it
+    with pytest.raises(ValueError, match="PostgreSQL"):
+        bulk_load(engine, "executions", EXECUTION_COLUMNS, execution_rows(SAMPLE_EXECUTIONS),
+                  merge_sql=EXECUTIONS_MERGE_SQL, merge_params={"product_code": "BTC_JPY"})
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM executions")).scalar() == 0
+
+
+def test_executions_merge_sql_template():
+    sql = EXECUTIONS_MERGE_SQL.format(cols="id, price", staging="staging_executions")
+    assert "INSERT INTO executions (product_code, id, price)" in sql
+    assert "FROM staging_executions" in sql
+    # every % must be a pyformat parameter, or psycopg2 will reject it
+    assert set(re.findall(r"%\(?\w*\)?s?", sql)) == {"%(product_code)s", "%(price_tick)s"}
+
+
+def test_partition_bounds_monthly():
+    bounds = partition_bounds(
+        datetime(2025, 11, 20, tzinfo=timezone.utc),
+        datetime(2025, 12, 3, tzinfo=timezone.utc),
+        granularity="month", lookahead=1)
+    assert bounds == [
+        ("executions_2025_11", date(2025, 11, 1), date(2025, 12, 1)),
+        ("executions_2025_12", date(2025, 12, 1), date(2026, 1, 1)),
+        ("executions_2026_01", date(2026, 1, 1), date(2026, 2, 1)),
+    ]
+
+
+def test_partition_bounds_daily():
+    bounds = partition_bounds(
+        datetime(2025, 6, 30, 23, 59, tzinfo=timezone.utc),
+        datetime(2025, 7, 1, 0, 1, tzinfo=timezone.utc),
+        granularity="day", lookahead=0)
+    assert [name for name, _, _ in bounds] == [
+        "executions_2025_06_30", "executions_2025_07_01"]
+
+
+def test_partition_range():
+    assert partition_range("executions_2025_06") == (date(2025, 6, 1), date(2025, 7, 1))
+    assert partition_range("executions_2025_06_30") == (date(2025, 6, 30), date(2025, 7, 1))
+    assert partition_range("executions_archive") is None
+
+
+class PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class FakePartitionConn:
+    """Stands in for a PostgreSQL connection; CREATE TABLE fails with error."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.created = []
+
+    @contextmanager
+    def begin_nested(self):
+        yield
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if sql.startswith("CREATE TABLE") and self.error is not None:
+            raise DBAPIError(sql, params, self.error)
+        if sql.startswith("CREATE TABLE"):
+            self.created.append(sql.split()[2])
+        return self
+
+    def scalar(self):
+        return False  # to_regclass: the partition does not exist yet
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+@pytest.fixture
+def known_partitions(monkeypatch):
+    known = set()
+    monkeypatch.setattr(exercises_03, "_known_partitions", known)
+    return known
+
+
+def test_ensure_partitions_retries_after_failure(known_partitions):
+    day = datetime(2025, 6, 9, tzinfo=timezone.utc)
+    with pytest.raises(DBAPIError):
+        ensure_partitions(FakePartitionConn(PgError("53100")), day, day, "month", 0)
+    assert known_partitions == set()
+
+    conn = FakePartitionConn()
+    assert ensure_partitions(conn, day, day, "month", 0) == ["executions_2025_06"]
+    assert known_partitions == {"executions_2025_06"}
+
+
+def test_ensure_partitions_skips_overlap(known_partitions):
+    day = datetime(2025, 6, 9, tzinfo=timezone.utc)
+    conn = FakePartitionConn(PgError(exercises_03.PG_INVALID_OBJECT_DEFINITION))
+    assert ensure_partitions(conn, day, day, "day", 0) == []
+    assert known_partitions == {"executions_2025_06_09"}
+
+
+def test_init_schema_forgets_partitions(known_partitions, tmp_path):
+    known_partitions.add("executions_2025_06")
+    sql_path = tmp_path / "schema.sql"
+    sql_path.write_text("CREATE TABLE t (id INTEGER);")
+    init_schema(create_engine("sqlite://"), str(sql_path))
+    assert known_partitions == set()
+
+
+def test_daily_stats_merge_across_batches(pg_engine):
+    # the second batch has trades before and after the first one's, plus
+    # 100 rows of the first batch again, which must not be counted twice
+    rows = list(execution_rows(synthetic_executions(3, 300, seed=3)))
+    shuffled = random.Random(3).sample(rows, len(rows))
+    load_executions(pg_engine, shuffled[:500], "BTC_JPY")
+    load_executions(pg_engine, shuffled[400:], "BTC_JPY")
+
+    expected, buckets = {}, {}
+    for row in sorted(rows, key=lambda r: (r[4], r[0])):
+        day = row[4].date()
+        price, size = Decimal(str(row[2])), Decimal(str(row[3]))
+        stats = expected.setdefault(day, {"high": price, "low": price, "open": price,
+                                          "volume": Decimal(0), "trade_count": 0})
+        stats.update(high=max(stats["high"], price), low=min(stats["low"], price), close=price,
+                     volume=stats["volume"] + size, trade_count=stats["trade_count"] + 1)
+        key = (day, price_bucket(price))
+        buckets[key] = buckets.get(key, Decimal(0)) + size
+
+    with pg_engine.connect() as conn:
+        stats = conn.execute(text("""
+            SELECT day, high, low, open, close, volume, trade_count
+            FROM daily_stats WHERE product_code = 'BTC_JPY'
+        """)).all()
+        histogram = conn.execute(text("""
+            SELECT day, bucket, volume FROM price_volume_buckets WHERE product_code = 'BTC_JPY'
+        """)).all()
+    assert {row.day: {k: v for k, v in row._asdict().items() if k != "day"}
+            for row in stats} == expected
+    assert {(row.day, row.bucket): row.volume for row in histogram} == buckets
+
+
+# executions as created by exercises_03.sql before it had product_code
+LEGACY_EXECUTIONS_DDL = (
+    "DROP TABLE executions CASCADE",
+    """
+    CREATE TABLE executions (
+        id BIGINT NOT NULL,
+        side TEXT NOT NULL CHECK (side IN ('BUY','SELL')),
+        price NUMERIC(20,8) NOT NULL,
+        size NUMERIC(20,8) NOT NULL,
+        exec_date TIMESTAMPTZ NOT NULL,
+        buy_child_order_acceptance_id TEXT,
+        sell_child_order_acceptance_id TEXT,
+        day DATE GENERATED ALWAYS AS ((exec_date AT TIME ZONE 'UTC')::date) STORED,
+        PRIMARY KEY (id, exec_date)
+    ) PARTITION BY RANGE (exec_date)
+    """,
+    """
+    CREATE TABLE executions_2025_06 PARTITION OF executions
+    FOR VALUES FROM ('2025-06-01 00:00:00+00') TO ('2025-07-01 00:00:00+00')
+    """,
+    "CREATE INDEX idx_executions_day_price ON executions(day, price)",
+    "INSERT INTO executions (id, side, price, size, exec_date) "
+    "VALUES (1, 'BUY', 100, 1, '2025-06-09 11:10:10+00')",
+)
+
+
+def test_migrate_schema_adds_product_code(pg_engine):
+    with pg_engine.begin() as conn:
+        for statement in LEGACY_EXECUTIONS_DDL:
+            conn.execute(text(statement))
+
+    assert exercises_03.migrate_schema(pg_engine)
+    assert not exercises_03.migrate_schema(pg_engine)
+
+    # the old rows belong to BTC_JPY; another product may reuse their ids
+    load_executions(pg_engine, execution_rows(SAMPLE_EXECUTIONS[:1]), "ETH_JPY")
+    with pg_engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT product_code, id FROM executions ORDER BY product_code")).all()
+    assert [tuple(row) for row in rows] == [("BTC_JPY", 1), ("ETH_JPY", 1)]
+
+
+def test_partition_indexes_on_every_child(pg_engine):
+    with pg_engine.begin() as conn:
+        ensure_partitions(conn, datetime(2025, 7, 3, tzinfo=timezone.utc),
+                          datetime(2025, 8, 1, tzinfo=timezone.utc))
+        exercises_03.ensure_partition_indexes(conn)
+        attached = conn.execute(text("""
+            SELECT p.relname AS index, c.relname AS partition
+            FROM pg_inherits pi
+            JOIN pg_class p ON p.oid = pi.inhparent
+            JOIN pg_index x ON x.indexrelid = pi.inhrelid
+            JOIN pg_class c ON c.oid = x.indrelid
+            WHERE p.relname IN ('idx_executions_day_price', 'idx_executions_product_price')
+        """)).all()
+    partitions = {"executions_2025_06", "executions_2025_07", "executions_2025_08",
+                  "executions_2025_09"}
+    for index in exercises_03.PARTITION_INDEXES:
+        assert {row.partition for row in attached if row.index == index} == partitions
@@ -1,73 +1,374 @@
 import os
-from fastapi import FastAPI, Query
-from utils import get_db, get_logger
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+import numpy as np
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from archive import encode_columns
+from cache import MemoryCache, cache_key, etag, etag_matches
+from utils import DB_POOL_SIZE, PRICE_BUCKET_TICK, get_async_db, get_logger, json_dumps, price_bucket
 from sqlalchemy import text
 
 script_base = os.path.splitext(os.path.basename(__file__))[0]
 log_filename = f"{script_base}.log"
 logger = get_logger(log_filename=log_filename)
 
-app = FastAPI()
-engine = get_db()
+engine = get_async_db()
+
+# Response cache. Rows of closed UTC days only change when the loader
+# backfills them, so they are cached under a key that includes the current
+# UTC date and a version of their daily_stats rows (see closed_days_version)
+# and live until either changes (and LRU eviction drops them). Today's row
+# and the version are re-read at most every CACHE_TODAY_TTL seconds. Any
+# backend with the Redis get/set(ex=)/delete API can replace MemoryCache.
+WINDOW_DAYS = 30
+CACHE_TODAY_TTL = float(os.getenv("CACHE_TODAY_TTL", "5"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+cache = MemoryCache(max_entries=CACHE_MAX_ENTRIES)
+
+# /candles settings. 1m is read straight from the candles table; coarser
+# resolutions are aggregated server-side with date_bin on UTC boundaries.
+CANDLE_RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+CANDLE_FORMATS = ("json", "columnar", "binary")
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume", "vwap")
+CANDLES_DEFAULT_LIMIT = int(os.getenv("CANDLES_DEFAULT_LIMIT", "500"))
+CANDLES_MAX_LIMIT = int(os.getenv("CANDLES_MAX_LIMIT", "5000"))
+CANDLES_ARCHIVE = "candles"  # archive kind, as written by exercises_02
+STREAM_CHUNK_ROWS = 1000  # rows encoded and sent per chunk of a streamed response
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson (see utils.json_dumps), so rows can be
+    returned with their Decimal/date/datetime values as-is.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+async def warm_pool(size: int = DB_POOL_SIZE):
+    """
+    Open size connections at once and return them to the pool, so the first
+    requests do not pay for connection setup. Every attempt is awaited
+    before any error is raised, so each connection that did open is closed.
+    """
+    opened = await asyncio.gather(
+        *(engine.connect().start() for _ in range(size)), return_exceptions=True)
+    conns = [conn for conn in opened if not isinstance(conn, BaseException)]
+    try:
+        pinged = await asyncio.gather(
+            *(conn.execute(text("SELECT 1")) for conn in conns), return_exceptions=True)
+        for result in opened + pinged:
+            if isinstance(result, BaseException):
+                raise result
+    finally:
+        await asyncio.gather(*(conn.close() for conn in conns))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await warm_pool()
+        logger.info("Warmed the database pool with %d connections", DB_POOL_SIZE)
+    except Exception:
+        # Serve anyway: connections are opened (and pre-pinged) on demand
+        logger.warning("Could not warm the database pool", exc_info=True)
+    yield
+    await engine.dispose()
+    logger.info("Disposed the database pool")
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+async def closed_days_version(product_code: str, since: date, until: date) -> str:
+    """
+    Token that changes whenever the loader touches a closed day of the
+    window: the number of days, their trade counts and last update in
+    daily_stats (one indexed row per day). The loader runs in another
+    process, so ingest cannot clear this cache directly; instead the token
+    goes into the closed-days key and is re-read every CACHE_TODAY_TTL
+    seconds, so a backfill shows up as quickly as today's trades do.
+    """
+    key = cache_key("closed-version", since, until, product_code=product_code)
+    version = cache.get(key)
+    if version is None:
+        async with engine.connect() as conn:
+            row = (await conn.execute(text("""
+                SELECT COUNT(*), SUM(trade_count), MAX(updated_at)
+                FROM daily_stats
+                WHERE product_code = :product_code
+                  AND day >= :since AND day < :until
+            """), {"product_code": product_code, "since": since, "until": until})).one()
+        version = ":".join(str(value) for value in row).encode()
+        cache.set(key, version, ex=CACHE_TODAY_TTL)
+    return version.decode()
+
+
+async def cached_window(endpoint: str, params: dict,
+                        fetch: Callable[..., Awaitable[List[dict]]]) -> bytes:
+    """
+    Return the rows of the last WINDOW_DAYS UTC days, newest first, as a
+    JSON array. fetch(since, until) loads the rows with since <= day < until;
+    closed days and today's row are cached separately as encoded JSON and
+    spliced together without decoding them.
+    """
+    today = datetime.now(timezone.utc).date()
+    since = today - timedelta(days=WINDOW_DAYS)
+
+    version = await closed_days_version(params["product_code"], since, today)
+    closed_key = cache_key(endpoint, "closed", today, version, **params)
+    closed = cache.get(closed_key)
+    if closed is None:
+        closed = json_dumps(await fetch(since, today))
+        cache.set(closed_key, closed)
+
+    today_key = cache_key(endpoint, "today", today, **params)
+    current = cache.get(today_key)
+    if current is None:
+        current = json_dumps(await fetch(today, today + timedelta(days=1)))
+        cache.set(today_key, current, ex=CACHE_TODAY_TTL)
+
+    return b"[" + b",".join(rows[1:-1] for rows in (current, closed) if rows != b"[]") + b"]"
+
+
+def cached_response(request: Request, data: bytes) -> Response:
+    """
+    Wrap a JSON array of rows as {"data": ...} with ETag/Cache-Control
+    headers, answering 304 when the client's If-None-Match already names
+    this body.
+    """
+    body = b'{"data":' + data + b"}"
+    headers = {
+        "ETag": etag(body),
+        "Cache-Control": f"public, max-age={int(CACHE_TODAY_TTL)}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/daily-high-low")
-def daily_high_low():
+async def daily_high_low(request: Request,
+                         product_code: str = Query("BTC_JPY", description="The product code")):
     """
     Get the highest and lowest price for each day in the last 30 days.
+
+    Reads the daily_stats summary maintained by the loader (exercises_03),
+    so the cost is one indexed row per day instead of a scan of executions.
     """
     logger.info("Request received: /daily-high-low")
-    with engine.connect() as conn:
-        sql = """
-            SELECT
-                day,
-                MAX(price) AS high,
-                MIN(price) AS low
-            FROM executions
-            WHERE day >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY day
-            ORDER BY day DESC
-        """
-        logger.info("Executing SQL for daily high/low prices")
-        result = conn.execute(text(sql))
-        data = [
-            {"day": str(row.day), "high": float(
-                row.high), "low": float(row.low)}
-            for row in result
-        ]
-    logger.info(f"Returning {len(data)} records for /daily-high-low")
-    return {"data": data}
+
+    async def fetch(since, until):
+        async with engine.connect() as conn:
+            sql = """
+                SELECT day, high, low
+                FROM daily_stats
+                WHERE product_code = :product_code
+                  AND day >= :since AND day < :until
+                ORDER BY day DESC
+            """
+            logger.info("Executing SQL for daily high/low prices")
+            result = await conn.execute(text(sql), {
+                "product_code": product_code, "since": since, "until": until})
+            return [row._asdict() for row in result]
+
+    data = await cached_window("daily-high-low", {"product_code": product_code}, fetch)
+    logger.info(f"Returning {len(data)} bytes for /daily-high-low")
+    return cached_response(request, data)
 
 
 @app.get("/daily-volume-by-price")
-def daily_volume_by_price(price: float = Query(..., description="The price threshold")):
+async def daily_volume_by_price(request: Request,
+                                price: float = Query(..., allow_inf_nan=False,
+                                                     description="The price threshold"),
+                                product_code: str = Query("BTC_JPY", description="The product code")):
     """
     Get daily volume above and below a given price for the last 30 days.
+
+    Buckets entirely above the threshold are summed from the
+    price_volume_buckets histogram, the bucket containing the threshold is
+    corrected exactly from the product's executions (a range scan of
+    idx_executions_product_price over one bucket) and volume_below is the daily total from daily_stats minus volume_above.
+    NUMERIC sums are exact, so the result equals a full scan of executions.
     """
     logger.info(f"Request received: /daily-volume-by-price?price={price}")
-    with engine.connect() as conn:
+    # The NUMERIC value the float parameter denotes (repr() is what psycopg2
+    # rendered into the original scan query), bound exactly as a Decimal
+    threshold = Decimal(repr(price))
+    bucket = price_bucket(threshold)
+
+    async def fetch(since, until):
+        async with engine.connect() as conn:
+            # MATERIALIZED: each CTE runs once. Right after a bulk load the
+            # planner's row estimates are stale and it may otherwise re-run a
+            # CTE inside a nested loop for every day of daily_stats.
+            sql = """
+                WITH above AS MATERIALIZED (
+                    SELECT day, SUM(volume) AS volume
+                    FROM price_volume_buckets
+                    WHERE product_code = :product_code
+                      AND day >= :since AND day < :until
+                      AND bucket > :bucket
+                    GROUP BY day
+                ),
+                boundary AS MATERIALIZED (
+                    SELECT day, SUM(size) AS volume
+                    FROM executions
+                    WHERE product_code = :product_code
+                      AND price >= :price
+                      AND price < :next_bucket
+                      AND day >= :since AND day < :until
+                    GROUP BY day
+                )
+                SELECT
+                    s.day,
+                    COALESCE(a.volume, 0) + COALESCE(b.volume, 0) AS volume_above,
+                    s.volume - COALESCE(a.volume, 0) - COALESCE(b.volume, 0) AS volume_below
+                FROM daily_stats s
+                LEFT JOIN above a ON a.day = s.day
+                LEFT JOIN boundary b ON b.day = s.day
+                WHERE s.product_code = :product_code
+                  AND s.day >= :since AND s.day < :until
+                ORDER BY s.day DESC
+            """
+            logger.info("Executing SQL for daily volume by price")
+            result = await conn.execute(text(sql), {
+                "price": threshold,
+                "bucket": bucket,
+                "next_bucket": bucket + PRICE_BUCKET_TICK,
+                "product_code": product_code,
+                "since": since,
+                "until": until,
+            })
+            return [row._asdict() for row in result]
+
+    data = await cached_window(
+        "daily-volume-by-price", {"price": str(threshold), "product_code": product_code}, fetch)
+    logger.info(f"Returning {len(data)} bytes for /daily-volume-by-price")
+    return cached_response(request, data)
+
+
+def _as_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+@app.get("/candles")
+async def candles(start: datetime = Query(..., alias="from", description="Start of the range (inclusive)"),
+                  end: datetime = Query(..., alias="to", description="End of the range (exclusive)"),
+                  resolution: str = Query("1m", pattern="^(" + "|".join(CANDLE_RESOLUTIONS) + ")$",
+                                          description="Candle width"),
+                  limit: int = Query(CANDLES_DEFAULT_LIMIT, ge=1, le=CANDLES_MAX_LIMIT,
+                                     description="Maximum number of candles"),
+                  cursor: Optional[datetime] = Query(None, description="next_cursor of the previous page"),
+                  encoding: str = Query("json", alias="format",
+                                        pattern="^(" + "|".join(CANDLE_FORMATS) + ")$",
+                                        description="Response encoding")):
+    """
+    Get candles in [from, to) at the given resolution, oldest first.
+
+    Pages are keyset-paginated on the candle start: pass next_cursor (also
+    sent as the X-Next-Cursor header) back as cursor to get the next page;
+    it is null on the last page. Naive timestamps are taken as UTC. Coarse
+    candles start on UTC multiples of the resolution, so a range starting
+    mid-bucket yields a partial first candle.
+
+    Encodings:
+      json     -> {"data": [{"minute": ..., "open": ..., ...}], "next_cursor": ...}
+      columnar -> {"columns": {"minute_ns": [...], "open": [...], ...}, "next_cursor": ...}
+      binary   -> the columnar archive format of archive.py (kind "candles")
+    """
+    logger.info(f"Request received: /candles?from={start}&to={end}&resolution={resolution}"
+                f"&limit={limit}&cursor={cursor}&format={encoding}")
+    start, end, cursor = _as_utc(start), _as_utc(end), _as_utc(cursor)
+    step = CANDLE_RESOLUTIONS[resolution]
+    if cursor is not None:
+        # the cursor is the start of the last candle already returned
+        start = max(start, cursor + step)
+
+    # one extra row tells whether another page follows
+    params = {"start": start, "end": end, "limit": limit + 1}
+    if resolution == "1m":
+        sql = """
+            SELECT minute, open, high, low, close, volume, vwap
+            FROM candles
+            WHERE minute >= :start AND minute < :end
+            ORDER BY minute
+            LIMIT :limit
+        """
+    else:
         sql = """
             SELECT
-                day,
-                SUM(CASE WHEN price >= :price THEN size ELSE 0 END) AS volume_above,
-                SUM(CASE WHEN price < :price THEN size ELSE 0 END) AS volume_below
-            FROM executions
-            WHERE day >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY day
-            ORDER BY day DESC
+                date_bin(CAST(:step AS INTERVAL), minute, TIMESTAMPTZ '1970-01-01 00:00:00+00') AS minute,
+                (array_agg(open ORDER BY minute))[1] AS open,
+                MAX(high) AS high,
+                MIN(low) AS low,
+                (array_agg(close ORDER BY minute DESC))[1] AS close,
+                SUM(volume) AS volume,
+                COALESCE(SUM(vwap * volume) / NULLIF(SUM(volume), 0),
+                         (array_agg(close ORDER BY minute DESC))[1]) AS vwap
+            FROM candles
+            WHERE minute >= :start AND minute < :end
+            GROUP BY 1
+            ORDER BY 1
+            LIMIT :limit
         """
-        logger.info("Executing SQL for daily volume by price")
-        result = conn.execute(text(sql), {"price": price})
-        data = [
-            {
-                "day": str(row.day),
-                "volume_above": float(row.volume_above),
-                "volume_below": float(row.volume_below)
-            }
-            for row in result
-        ]
-    logger.info(f"Returning {len(data)} records for /daily-volume-by-price")
-    return {"data": data}
+        params["step"] = step
+
+    # The page is fetched before anything is sent, so the pooled connection
+    # is released before a slow client starts reading.
+    async with engine.connect() as conn:
+        logger.info("Executing SQL for candles")
+        result = await conn.execute(text(sql), params)
+        rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _candle_cursor(rows[-1].minute)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    logger.info(f"Returning {len(rows)} candles for /candles")
+
+    if encoding == "json":
+        # Streamed from memory in chunks, so the body is never one buffer
+        return StreamingResponse(_stream_candles(rows, next_cursor),
+                                 media_type="application/json", headers=headers)
+    columns = {"minute_ns": np.array(
+        [int(row.minute.timestamp()) * 1_000_000_000 for row in rows], dtype=np.int64)}
+    for f in CANDLE_FIELDS:
+        columns[f] = np.array([getattr(row, f) for row in rows], dtype=np.float64)
+    if encoding == "columnar":
+        return ORJSONResponse({"columns": columns, "next_cursor": next_cursor}, headers=headers)
+    return Response(content=encode_columns(CANDLES_ARCHIVE, columns),
+                    media_type="application/octet-stream", headers=headers)
+
+
+def _candle_cursor(minute: datetime) -> str:
+    return minute.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _stream_candles(rows: List[Any], next_cursor: Optional[str]) -> Iterator[bytes]:
+    """
+    Yield {"data": [...], "next_cursor": ...} for a fetched page, encoding
+    STREAM_CHUNK_ROWS rows per chunk.
+    """
+    yield b'{"data":['
+    for i in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = b",".join(json_dumps(row._asdict()) for row in rows[i:i + STREAM_CHUNK_ROWS])
+        yield (b"," if i else b"") + chunk
+    yield b'],"next_cursor":' + json_dumps(next_cursor) + b"}"
 
 # To run with custom port and debug, use:
 # uvicorn exercises_04:app --reload --port 8080
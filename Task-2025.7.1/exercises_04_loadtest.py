@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import requests
+
+OUTPUT_DIR = "./output"
+script_base = os.path.splitext(os.path.basename(__file__))[0]
+results_filename = os.path.join(OUTPUT_DIR, f"{script_base}.json")
+
+# Synthetic market used to seed the database
+START_PRICE = 15_000_000.0
+PRICE_STEP = 500.0         # Standard deviation of the per-trade price walk
+DB_NAME = "pafindb"        # Database created inside an ephemeral instance
+
+ENDPOINTS = ("daily-high-low", "daily-volume-by-price")
+READY_TIMEOUT = 30         # Seconds to wait for the API server to come up
+
+
+def synthetic_executions(days: int, trades_per_day: int, seed: int = 0,
+                         now: Optional[datetime] = None) -> Iterator[dict]:
+    """
+    Yield bitFlyer-style execution dicts covering the last days UTC days up
+    to now (today is filled up to the current time), trades_per_day per day
+    with a random-walk price.
+    """
+    rng = np.random.default_rng(seed)
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    price = START_PRICE
+    next_id = 1
+    for offset in range(days - 1, -1, -1):
+        day_start = today - timedelta(days=offset)
+        span_ms = int(min(now - day_start, timedelta(days=1)).total_seconds() * 1000)
+        times = np.sort(rng.integers(0, max(span_ms, 1), trades_per_day))
+        prices = np.round(price + np.cumsum(rng.normal(0, PRICE_STEP, trades_per_day)))
+        sizes = np.round(rng.exponential(0.02, trades_per_day) + 0.0001, 8)
+        sides = np.where(rng.random(trades_per_day) < 0.5, "BUY", "SELL")
+        price = float(prices[-1])
+        base = np.datetime64(day_start.replace(tzinfo=None), "ms")
+        dates = np.datetime_as_string(base + times.astype("timedelta64[ms]"), unit="ms")
+        for i in range(trades_per_day):
+            yield {
+                "id": next_id,
+                "side": str(sides[i]),
+                "price": float(prices[i]),
+                "size": float(sizes[i]),
+                "exec_date": str(dates[i]),
+                "buy_child_order_acceptance_id": f"JRF{next_id:08d}B",
+                "sell_child_order_acceptance_id": f"JRF{next_id:08d}S",
+            }
+            next_id += 1
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def ephemeral_postgres() -> Iterator[Dict[str, str]]:
+    """
+    Run a throwaway PostgreSQL cluster (initdb + pg_ctl from PATH or PG_BIN)
+    in a temporary directory and yield the DB_* settings that reach it.
+    """
+    bin_dir = os.getenv("PG_BIN", "")
+    initdb = os.path.join(bin_dir, "initdb") if bin_dir else shutil.which("initdb")
+    pg_ctl = os.path.join(bin_dir, "pg_ctl") if bin_dir else shutil.which("pg_ctl")
+    if not initdb or not pg_ctl:
+        raise RuntimeError("initdb/pg_ctl not found; add them to PATH or set PG_BIN")
+
+    data_dir = tempfile.mkdtemp(prefix="pg_loadtest_")
+    port = _free_port()
+    try:
+        subprocess.run([initdb, "-D", data_dir, "-U", "postgres", "--auth=trust", "--encoding=UTF8"],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([pg_ctl, "-D", data_dir, "-w", "-l", os.path.join(data_dir, "server.log"),
+                        "-o", f"-p {port} -k {data_dir} -c listen_addresses=127.0.0.1",
+                        "start"], check=True, stdout=subprocess.DEVNULL)
+        try:
+            import psycopg2
+            conn = psycopg2.connect(host="127.0.0.1", port=port, user="postgres", dbname="postgres")
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE DATABASE {DB_NAME}")
+            conn.close()
+            yield {"DB_HOST": "127.0.0.1", "DB_PORT": str(port), "DB_USER": "postgres",
+                   "DB_PASSWORD": "postgres", "DB_NAME": DB_NAME}
+        finally:
+            subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "stop"],
+                           check=False, stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def seed(days: int, trades_per_day: int) -> float:
+    """
+    Recreate the exercises_03 schema and load days x trades_per_day synthetic
+    executions through the production loader, so daily_stats and the price
+    histogram are maintained exactly as in production. Returns the seconds
+    spent loading.
+    """
+    # Imported here: utils reads the DB_* settings at import time
+    from utils import get_db
+    from exercises_03 import execution_rows, init_schema, load_executions
+
+    engine = get_db()
+    init_schema(engine)
+    start = time.perf_counter()
+    load_executions(engine, execution_rows(synthetic_executions(days, trades_per_day)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+@contextmanager
+def api_server(port: int, workers: int, env: Dict[str, str]) -> Iterator[str]:
+    """
+    Run exercises_04 under uvicorn in a subprocess and yield its base URL
+    once it answers.
+    """
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "exercises_04:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env})
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + READY_TIMEOUT
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"API server exited with status {proc.returncode}")
+            try:
+                if requests.get(f"{base_url}/daily-high-low", timeout=2).ok:
+                    break
+            except requests.ConnectionError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("API server did not become ready")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # requests still waiting on the database keep the server from exiting
+            proc.kill()
+            proc.wait()
+
+
+def _request_url(base_url: str, endpoint: str, rng: np.random.Generator) -> str:
+    if endpoint == "daily-volume-by-price":
+        # spread thresholds over the seeded price range so the boundary
+        # bucket (and the cache key) varies between requests
+        price = round(START_PRICE + rng.normal(0, 50 * PRICE_STEP))
+        return f"{base_url}/{endpoint}?price={price}"
+    return f"{base_url}/{endpoint}"
+
+
+def drive(base_url: str, endpoint: str, concurrency: int, duration: float, warmup: float) -> dict:
+    """
+    Hit endpoint from concurrency client threads, each with its own
+    keep-alive session, for warmup + duration seconds. Only requests started
+    after the warm-up are measured.
+    """
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = time.perf_counter() + warmup
+    stop = start + duration
+    barrier = threading.Barrier(concurrency)
+
+    def client(index: int):
+        rng = np.random.default_rng(index)
+        with requests.Session() as session:
+            barrier.wait()
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= stop:
+                    break
+                try:
+                    ok = session.get(_request_url(base_url, endpoint, rng), timeout=30).ok
+                except requests.RequestException:
+                    ok = False
+                if t0 < start:
+                    continue
+                if ok:
+                    latencies[index].append(time.perf_counter() - t0)
+                else:
+                    errors[index] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+
+    samples = np.array([x for per_client in latencies for x in per_client]) * 1000
+    stats = {"requests": int(samples.size), "errors": sum(errors),
+             "rps": round(samples.size / duration, 1)}
+    if samples.size:
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        stats.update({"mean_ms": round(float(samples.mean()), 2), "p50_ms": round(float(p50), 2),
+                      "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+                      "max_ms": round(float(samples.max()), 2)})
+    return stats
+
+
+def run(args, db_env: Dict[str, str]) -> List[dict]:
+    os.environ.update(db_env)
+    server_env = {**db_env, "LOG_MODE": "production", "DB_ECHO": "0"}
+    if args.no_cache:
+        server_env["CACHE_MAX_ENTRIES"] = "0"
+
+    results = []
+    for days in args.days:
+        rows = days * args.trades_per_day
+        if not args.skip_seed:
+            print(f"Seeding {days} days x {args.trades_per_day:,} trades ({rows:,} rows)...", flush=True)
+            seconds = seed(days, args.trades_per_day)
+            print(f"  loaded in {seconds:.1f}s ({rows / seconds:,.0f} rows/s)", flush=True)
+        with api_server(args.port, args.workers, server_env) as base_url:
+            for endpoint in args.endpoints:
+                stats = drive(base_url, endpoint, args.concurrency, args.duration, args.warmup)
+                result = {"days": days, "rows": rows, "endpoint": endpoint, **stats}
+                results.append(result)
+                print(f"{days:>4}d {rows:>12,} rows  /{endpoint:<22} "
+                      f"{stats['rps']:>8.1f} req/s  p50 {stats.get('p50_ms', 0):>7.2f} ms  "
+                      f"p95 {stats.get('p95_ms', 0):>7.2f} ms  p99 {stats.get('p99_ms', 0):>7.2f} ms  "
+                      f"errors {stats['errors']}", flush=True)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the exercises_04 API.")
+    parser.add_argument("--days", default="7,30",
+                        help="comma-separated dataset sizes in days; each is seeded and tested in turn")
+    parser.add_argument("--trades-per-day", type=int, default=20_000)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client threads")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--ephemeral", action="store_true",
+                        help="run against a throwaway PostgreSQL cluster instead of DB_* settings")
+    parser.add_argument("--no-cache", action="store_true", help="disable the API response cache")
+    parser.add_argument("--skip-seed", action="store_true", help="test the data already in the database")
+    args = parser.parse_args(argv)
+    args.days = [int(d) for d in args.days.split(",") if d]
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+
+    if args.ephemeral:
+        with ephemeral_postgres() as db_env:
+            results = run(args, db_env)
+    else:
+        results = run(args, {})
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(results_filename, "w", encoding="utf-8") as f:
+        json.dump({"date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                   "concurrency": args.concurrency, "workers": args.workers,
+                   "cache": not args.no_cache, "results": results}, f, indent=2)
+    print(f"Results written to {results_filename}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+from exercises_03 import execution_rows
+from exercises_04_loadtest import drive, synthetic_executions
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status = 500 if "price=" in self.path and self.server.fail_prices else 200
+        body = b'{"data":[]}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubApiHandler)
+    server.fail_prices = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_synthetic_executions_cover_each_day():
+    now = datetime(2025, 7, 10, 6, 0, tzinfo=timezone.utc)
+    rows = list(execution_rows(synthetic_executions(3, 50, now=now)))
+    assert len(rows) == 150
+    assert [r[0] for r in rows] == list(range(1, 151))
+    days = [r[4].date() for r in rows]
+    assert days == sorted(days)
+    assert {d: days.count(d) for d in set(days)} == {
+        (now - timedelta(days=n)).date(): 50 for n in range(3)}
+    # today's trades never lie in the future
+    assert max(r[4] for r in rows) <= now
+
+
+def test_drive_reports_percentiles(stub_api):
+    base_url = f"http://127.0.0.1:{stub_api.server_address[1]}"
+    stats = drive(base_url, "daily-high-low", concurrency=4, duration=0.5, warmup=0.1)
+    assert stats["requests"] > 0 and stats["errors"] == 0
+    assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+    stub_api.fail_prices = True
+    stats = drive(base_url, "daily-volume-by-price", concurrency=2, duration=0.3, warmup=0)
+    assert stats["requests"] == 0 and stats["errors"] > 0
@@ -0,0 +1,201 @@
+import asyncio
+from decimal import Decimal
+from urllib.parse import urlencode
+import orjson
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+import exercises_04
+from cache import MemoryCache
+from exercises_03 import execution_rows, load_executions
+from exercises_04_loadtest import synthetic_executions
+from utils import PRICE_BUCKET_TICK, price_bucket
+
+
+def call(path: str, **params) -> tuple:
+    """
+    Send one GET request straight to the ASGI app (no lifespan) and return
+    (status, headers, body).
+    """
+    messages = []
+    requested = False
+    done = asyncio.Event()
+
+    async def receive():
+        # the request once, then a disconnect after the response is complete
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+    asyncio.run(exercises_04.app(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), body
+
+
+@pytest.fixture
+def api(pg_engine, pg_url, monkeypatch):
+    """
+    Point exercises_04 at the test database, with an empty response cache.
+    NullPool: every call() runs in its own event loop.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    engine = create_async_engine(pg_url.replace("+psycopg2", "+asyncpg"), poolclass=NullPool)
+    monkeypatch.setattr(exercises_04, "engine", engine)
+    monkeypatch.setattr(exercises_04, "cache", MemoryCache())
+    return pg_engine
+
+
+class FakeConnection:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.closed = False
+
+    async def start(self):
+        await asyncio.sleep(0 if self.fail else 0.01)
+        if self.fail:
+            raise ConnectionError("refused")
+        return self
+
+    async def execute(self, statement):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    def __init__(self, failures: int):
+        self.conns = []
+        self.failures = failures
+
+    def connect(self):
+        self.conns.append(FakeConnection(len(self.conns) < self.failures))
+        return self.conns[-1]
+
+
+def test_warm_pool_closes_connections_when_one_fails(monkeypatch):
+    fake = FakeEngine(failures=1)
+    monkeypatch.setattr(exercises_04, "engine", fake)
+    with pytest.raises(ConnectionError):
+        asyncio.run(exercises_04.warm_pool(size=3))
+    # the two that opened after the failure are closed, not leaked
+    assert [conn.closed for conn in fake.conns] == [False, True, True]
+
+
+@pytest.mark.parametrize("price", ["inf", "-inf", "nan"])
+def test_daily_volume_by_price_rejects_non_finite(price):
+    status, _, _ = call("/daily-volume-by-price", price=price)
+    assert status == 422
+
+
+def test_daily_volume_by_price_matches_scan(api):
+    # two products with the same execution ids and overlapping prices
+    load_executions(api, execution_rows(synthetic_executions(3, 400, seed=1)), "BTC_JPY")
+    load_executions(api, execution_rows(synthetic_executions(3, 400, seed=2)), "ETH_JPY")
+    with api.connect() as conn:
+        median = conn.execute(text(
+            "SELECT percentile_disc(0.5) WITHIN GROUP (ORDER BY price) "
+            "FROM executions WHERE product_code = 'BTC_JPY'")).scalar()
+    # a threshold strictly inside a bucket, so the boundary correction matters
+    threshold = price_bucket(median) + PRICE_BUCKET_TICK * Decimal("0.4375")
+    assert price_bucket(threshold) != threshold
+
+    status, _, body = call("/daily-volume-by-price", price=str(threshold), product_code="BTC_JPY")
+    assert status == 200
+    data = orjson.loads(body)["data"]
+
+    with api.connect() as conn:
+        expected = conn.execute(text("""
+            SELECT day,
+                   COALESCE(SUM(size) FILTER (WHERE price >= :price), 0) AS volume_above,
+                   COALESCE(SUM(size) FILTER (WHERE price < :price), 0) AS volume_below
+            FROM executions
+            WHERE product_code = 'BTC_JPY'
+            GROUP BY day
+            ORDER BY day DESC
+        """), {"price": threshold}).all()
+    assert len(data) == len(expected) == 3
+    assert any(row.volume_above and row.volume_below for row in expected)
+    for got, row in zip(data, expected):
+        assert got == {"day": row.day.isoformat(),
+                       "volume_above": float(row.volume_above),
+                       "volume_below": float(row.volume_below)}
+
+
+def test_candles_json_pages_with_header(api, monkeypatch):
+    monkeypatch.setattr(exercises_04, "STREAM_CHUNK_ROWS", 2)
+    with api.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO candles (minute, open, high, low, close, volume, vwap)
+            SELECT TIMESTAMPTZ '2025-06-09 00:00:00+00' + n * INTERVAL '1 minute',
+                   100 + n, 101 + n, 99 + n, 100.5 + n, 1, 100 + n
+            FROM generate_series(0, 6) AS n
+        """))
+    window = {"from": "2025-06-09T00:00:00Z", "to": "2025-06-09T01:00:00Z", "limit": 5}
+
+    status, headers, body = call("/candles", **window)
+    page = orjson.loads(body)
+    assert status == 200
+    assert [row["open"] for row in page["data"]] == [100, 101, 102, 103, 104]
+    assert page["next_cursor"] == headers["x-next-cursor"] == "2025-06-09T00:04:00Z"
+
+    status, headers, body = call("/candles", cursor=page["next_cursor"], **window)
+    page = orjson.loads(body)
+    assert [row["open"] for row in page["data"]] == [105, 106]
+    assert page["next_cursor"] is None and "x-next-cursor" not in headers
+
+
+def test_daily_high_low_after_two_batches(api):
+    rows = list(execution_rows(synthetic_executions(3, 300, seed=4)))
+    load_executions(api, rows[::2], "BTC_JPY")
+    load_executions(api, rows[1::2], "BTC_JPY")
+
+    status, _, body = call("/daily-high-low", product_code="BTC_JPY")
+    assert status == 200
+    with api.connect() as conn:
+        expected = conn.execute(text("""
+            SELECT day, MAX(price) AS high, MIN(price) AS low
+            FROM executions
+            WHERE product_code = 'BTC_JPY'
+            GROUP BY day
+            ORDER BY day DESC
+        """)).all()
+    assert orjson.loads(body)["data"] == [
+        {"day": row.day.isoformat(), "high": float(row.high), "low": float(row.low)}
+        for row in expected]
+
+
+def test_daily_high_low_sees_backfill(api, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(exercises_04, "cache", MemoryCache(clock=lambda: now[0]))
+    rows = list(execution_rows(synthetic_executions(3, 300, seed=5)))
+    load_executions(api, rows, "BTC_JPY")
+    status, _, body = call("/daily-high-low", product_code="BTC_JPY")
+    oldest = orjson.loads(body)["data"][-1]
+
+    # a late trade for the oldest (closed) day, above its high
+    first = rows[0]
+    late = (len(rows) + 1, first[1], oldest["high"] + 1000, first[3]) + first[4:]
+    load_executions(api, [late], "BTC_JPY")
+    _, _, cached = call("/daily-high-low", product_code="BTC_JPY")
+    assert cached == body
+
+    now[0] += exercises_04.CACHE_TODAY_TTL
+    _, _, body = call("/daily-high-low", product_code="BTC_JPY")
+    assert orjson.loads(body)["data"][-1] == dict(oldest, high=oldest["high"] + 1000)
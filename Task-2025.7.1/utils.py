@@ -1,5 +1,16 @@
 import os
+import re
+import copy
+import json
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterator
+import orjson
 import sqlalchemy
 from sqlalchemy import create_engine
 
@@ -10,6 +21,17 @@ OUTPUT_DIR = "./output"
 os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Logging configuration from environment variables:
+#   LOG_MODE=production  -> log records are handed to a background thread
+#                           (QueueHandler/QueueListener) and SQL echo is off
+#   LOG_LEVEL            -> DEBUG, INFO, WARNING, ... (default INFO)
+#   DB_ECHO              -> 1/0 to force SQLAlchemy statement logging on/off
+LOG_MODE = os.getenv("LOG_MODE", "debug")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+DB_ECHO = os.getenv("DB_ECHO", "0" if LOG_MODE == "production" else "1") == "1"
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
 # Load database connection parameters from environment variables or use defaults
 DB_USER = os.getenv("DB_USER",       "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
@@ -22,30 +44,238 @@ DATABASE_URL = (
     f"postgresql+psycopg2://"
     f"{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://"
+    f"{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Connection pool settings shared by the sync and async engines
+#   DB_POOL_SIZE      -> connections kept open in the pool (default 5)
+#   DB_MAX_OVERFLOW   -> extra connections allowed under burst load (default 10)
+#   DB_POOL_TIMEOUT   -> seconds to wait for a free connection (default 30)
+#   DB_POOL_RECYCLE   -> seconds after which a connection is replaced, -1 = never
+#   DB_POOL_PRE_PING  -> 1/0 to test connections on checkout (default 1)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Width of the price buckets of the price_volume_buckets histogram. Shared by
+# the loader (exercises_03) and the API (exercises_04); changing it requires
+# rebuilding the histogram.
+PRICE_BUCKET_TICK = Decimal(os.getenv("PRICE_BUCKET_TICK", "1000"))
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that only resolves what cannot wait: the message (msg % args,
+    so later changes to mutable arguments do not show) and the traceback.
+    Timestamps and the line layout are formatted on the listener thread
+    instead of the caller's hot path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+def _start_queue_logging(logger: logging.Logger, log_filename: str = None):
+    """
+    Attach a queue handler to the logger and start a QueueListener that
+    writes to the log file (or stderr) from a background thread.
+    """
+    if log_filename:
+        target = logging.FileHandler(f"{LOG_DIR}/{log_filename}", mode="a")
+    else:
+        target = logging.StreamHandler()
+    target.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, target)
+    listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(listener.stop)
+
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
 
 
 def get_logger(log_filename: str = None) -> logging.Logger:
     """
     Create and return a logger instance.
     If log_filename is provided, logs will be written to the specified file under LOG_DIR.
+    With LOG_MODE=production the file is written by a background queue listener.
     """
     logger = logging.getLogger("bitflyer-crawler")
-    if not logger.handlers:
+    if LOG_MODE == "production":
+        if not logger.handlers:
+            _start_queue_logging(logger, log_filename)
+    elif not logger.handlers:
         logging.basicConfig(
             filename=f"{LOG_DIR}/{log_filename}" if log_filename else None,
             filemode="a",
-            level=logging.INFO,
-            format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
+            level=LOG_LEVEL,
+            format=LOG_FORMAT,
+            datefmt=LOG_DATEFMT
         )
     return logger
 
 
+def _pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
 def get_db() -> sqlalchemy.engine.Engine:
     """
     Create and return a SQLAlchemy engine for database operations.
-    echo=True enables SQL statement logging for debugging.
+    echo enables SQL statement logging for debugging (see DB_ECHO).
     future=True enables SQLAlchemy 2.0 style usage.
+    Pool sizing comes from the DB_POOL_* settings.
     """
-    engine = create_engine(DATABASE_URL, echo=True, future=True)
+    engine = create_engine(DATABASE_URL, echo=DB_ECHO, future=True, **_pool_options())
     return engine
+
+
+def get_async_db() -> "sqlalchemy.ext.asyncio.AsyncEngine":
+    """
+    Create and return an asyncio SQLAlchemy engine (asyncpg driver) with the
+    same echo and DB_POOL_* settings as get_db(). No connection is opened
+    until first use. Imported lazily so the sync scripts do not need the
+    asyncio extras.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    return create_async_engine(ASYNC_DATABASE_URL, echo=DB_ECHO, **_pool_options())
+
+
+def price_bucket(price: Decimal, tick: Decimal = PRICE_BUCKET_TICK) -> Decimal:
+    """
+    Return the lower bound of the histogram bucket that contains price,
+    i.e. floor(price / tick) * tick, computed exactly.
+    """
+    return (price // tick - (price % tick < 0)) * tick
+
+
+def _json_default(obj):
+    # orjson serializes datetime/date, dataclasses and numpy arrays natively;
+    # NUMERIC columns arrive as Decimal and are rendered as JSON numbers
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialize obj to compact UTF-8 JSON with orjson, rendering Decimal as a
+    number and datetime/date as ISO 8601 strings.
+    """
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def datetime_to_ns(ts: datetime) -> int:
+    """
+    Convert a datetime to integer nanoseconds since the Unix epoch (naive = UTC).
+    """
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    """
+    Convert epoch nanoseconds back to a UTC datetime (microsecond precision).
+    """
+    return EPOCH + timedelta(microseconds=ns // 1000)
+
+
+# Nanoseconds per unit of a fraction with 1..6 digits
+_FRACTION_SCALE = (None, 100_000_000, 10_000_000, 1_000_000, 100_000, 10_000, 1000)
+
+
+@lru_cache(maxsize=4096)
+def _minute_prefix_ns(prefix: str) -> int:
+    """
+    Epoch nanoseconds of a 'YYYY-MM-DDTHH:MM' prefix, memoized because a
+    day of trades only has 1440 distinct minutes.
+    """
+    return datetime_to_ns(datetime.fromisoformat(prefix))
+
+
+def exec_date_to_ns(exec_date: str) -> int:
+    """
+    Decode a bitFlyer exec_date string into epoch nanoseconds (UTC).
+
+    bitFlyer sends naive UTC strings such as '2025-06-09T11:10:10.123'. The
+    fast path looks up the memoized minute prefix and only parses seconds and
+    the fraction per trade. Anything else (offsets, 'Z', odd layouts) falls
+    back to datetime.fromisoformat. Both paths truncate to microseconds, the
+    precision of datetime and PostgreSQL TIMESTAMPTZ.
+    """
+    if len(exec_date) >= 19 and exec_date[16] == ':' and exec_date.isascii():
+        sec = exec_date[17:19]
+        if sec.isdigit() and sec < '60' and (
+                len(exec_date) == 19
+                or (exec_date[19] == '.' and exec_date[20:].isdigit())):
+            ns = _minute_prefix_ns(exec_date[:16]) + int(sec) * 1_000_000_000
+            frac = exec_date[20:26]
+            if frac:
+                ns += int(frac) * _FRACTION_SCALE[len(frac)]
+            return ns
+    return datetime_to_ns(datetime.fromisoformat(exec_date))
+
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_records(file_path: str, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Incrementally parse objects from a JSON array file (e.g. the crawler
+    output) or from NDJSON (one object per line).
+
+    The file is read chunk_size characters at a time and each object is
+    decoded with JSONDecoder.raw_decode as soon as it is complete, so memory
+    stays bounded by the chunk size instead of the file size.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = _SEPARATORS.match(buf).end()
+        if buf[pos:pos + 1] == '[':
+            pos += 1
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if buf[pos:pos + 1] == ']':
+                break
+            if pos < len(buf):
+                try:
+                    obj, pos = decoder.raw_decode(buf, pos)
+                    yield obj
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            elif eof:
+                break
+            # Object is incomplete (or the buffer is drained): read another chunk
+            more = f.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
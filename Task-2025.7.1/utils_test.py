@@ -0,0 +1,97 @@
+import os
+import sys
+import random
+import subprocess
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+
+from utils import datetime_to_ns, ns_to_datetime, exec_date_to_ns, json_dumps, price_bucket
+
+
+def reference_ns(exec_date: str) -> int:
+    # the parsing exercises_02 used before the fast path
+    ts = datetime.fromisoformat(exec_date)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return datetime_to_ns(ts)
+
+
+@pytest.mark.parametrize("exec_date", [
+    "2025-06-09T11:10:10.000",
+    "2025-06-09T11:10:10.12",
+    "2025-06-09T11:10:10.1234567",   # 7 fraction digits, truncated to microseconds
+    "2025-06-09T11:10:10",
+    "2025-06-09T11:10:10Z",
+    "2025-06-09T11:10:10.5+09:00",   # explicit offset takes the fallback path
+    "2025-06-09T11:10",
+    "1969-12-31T23:59:59.999",
+])
+def test_exec_date_to_ns_matches_fromisoformat(exec_date):
+    assert exec_date_to_ns(exec_date) == reference_ns(exec_date)
+
+
+def test_exec_date_to_ns_random_equivalence():
+    rng = random.Random(42)
+    base = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    for _ in range(2000):
+        ts = base + timedelta(microseconds=rng.randrange(86400 * 30 * 10**6))
+        digits = rng.choice([0, 1, 2, 3, 6])
+        exec_date = ts.strftime("%Y-%m-%dT%H:%M:%S")
+        if digits:
+            exec_date += "." + f"{ts.microsecond:06d}"[:digits]
+        assert exec_date_to_ns(exec_date) == reference_ns(exec_date)
+
+
+def test_ns_to_datetime_roundtrip():
+    ts = datetime(2025, 6, 9, 11, 10, 10, 123456, tzinfo=timezone.utc)
+    assert ns_to_datetime(datetime_to_ns(ts)) == ts
+    assert ns_to_datetime(datetime_to_ns(ts)).tzinfo == timezone.utc
+
+
+@pytest.mark.parametrize("price, expected", [
+    ("5000000", "5000000"),
+    ("5000999.99999999", "5000000"),
+    ("0.5", "0"),
+    ("-0.5", "-1000"),
+    ("-1000", "-1000"),
+])
+def test_price_bucket(price, expected):
+    assert price_bucket(Decimal(price), Decimal(1000)) == Decimal(expected)
+
+
+def test_json_dumps_decimal_and_dates():
+    row = {
+        "day": datetime(2025, 7, 1).date(),
+        "minute": datetime(2025, 7, 1, 0, 1, tzinfo=timezone.utc),
+        "high": Decimal("15000000.12345678"),
+    }
+    assert json_dumps(row) == (
+        b'{"day":"2025-07-01","minute":"2025-07-01T00:01:00+00:00","high":15000000.12345678}')
+    with pytest.raises(TypeError):
+        json_dumps({"x": object()})
+
+
+def test_production_logging_flushes_at_exit(tmp_path):
+    # records go through the queue listener and are all written at exit
+    script = (
+        "from utils import get_logger\n"
+        "logger = get_logger('queue.log')\n"
+        "items = ['first']\n"
+        "logger.info('items %s', items)\n"
+        "items.append('changed')\n"
+        "for i in range(1000):\n"
+        "    logger.info('record %d', i)\n"
+        "try:\n"
+        "    1 / 0\n"
+        "except ZeroDivisionError:\n"
+        "    logger.exception('failed')\n"
+    )
+    env = dict(os.environ, LOG_MODE="production", PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True)
+
+    lines = (tmp_path / "log" / "queue.log").read_text(encoding="utf-8").splitlines()
+    assert lines[0].endswith("INFO [bitflyer-crawler] items ['first']")
+    assert [line.rsplit(" ", 1)[1] for line in lines[1:1001]] == [str(i) for i in range(1000)]
+    assert lines[1001].endswith("ERROR [bitflyer-crawler] failed")
+    assert lines[-1] == "ZeroDivisionError: division by zero"
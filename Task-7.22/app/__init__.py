@@ -11,8 +11,10 @@ Date: 2024-05-29
 from flask import Flask, jsonify
 import traceback
 from config import Config
+from .db import db
 from .logger import logger_handler
 from .routes import create_routes
+from .serializers import ORJSONProvider
 
 
 def create_app():
@@ -23,11 +25,13 @@ def create_app():
         Flask: Configured Flask application instance.
     """
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)  # orjson for jsonify and request parsing
 
     # Apply configuration settings from the Config class to the Flask application.
     app.config.from_object(Config)
 
     create_routes(app)  # Register routes defined in create_routes function
+    db.init_app(app)  # Return pooled connections at the end of each app context
 
     # Set logging level for the application
     app.logger.setLevel(Config.LOG_LEVEL)
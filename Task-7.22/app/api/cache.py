@@ -0,0 +1,20 @@
+"""
+Python script for exposing cache statistics.
+
+This file defines the CacheStatsHandler class, which reports the hit/miss
+counters of the recipe read cache for the worker process serving the request.
+"""
+
+from flask_restful import Resource
+from ..models.recipe import Recipe
+
+
+class CacheStatsHandler(Resource):
+    def get(self):
+        """
+        Handle GET requests to retrieve the recipe cache counters.
+
+        Returns:
+            dict: Hits, misses, hit ratio and backend of this worker's cache.
+        """
+        return Recipe.cache_stats()
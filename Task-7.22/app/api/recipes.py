@@ -1,28 +1,64 @@
 """
 Python script for handling recipe-related API endpoints.
 
-This file defines the RecipesHandler and RecipeHandler classes to manage the
-creation, retrieval, update, and deletion of recipes via API endpoints.
+This file defines the RecipesHandler, RecipeHandler and RecipesBulkHandler classes
+to manage the creation, retrieval, update, and deletion of recipes via API endpoints.
 
 Developer: WangPeifeng
 Date: 2024-05-28
 """
 
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 from ..models.recipe import Recipe
 
 
+def missing_keys(form_data, keys):
+    """
+    Return the keys that are absent or empty in the submitted data.
+
+    Args:
+        form_data (dict): The submitted recipe.
+        keys (list): The required keys.
+
+    Returns:
+        list: The missing keys.
+    """
+    return [k for k in keys if not form_data.get(k)]
+
+
 class RecipesHandler(Resource):
     def get(self):
         """
-        Handle GET requests to retrieve all recipes.
+        Handle GET requests to retrieve a page of recipes.
+
+        Query parameters:
+            after_id (int, optional): Return recipes with an ID greater than this. Default is 0.
+            limit (int, optional): Page size, at most RECIPES_MAX_PAGE_SIZE. Default is RECIPES_PAGE_SIZE.
+            fields (str, optional): Comma-separated columns to return.
 
         Returns:
-            dict: A dictionary containing a list of all recipes.
+            tuple: The recipes of the page with the after_id of the next page, the status code,
+            and an X-Total-Count header with the number of recipes.
         """
-        res = Recipe.get_all()
-        return res
+        config = current_app.config
+        try:
+            after_id = int(request.args.get("after_id", 0))
+            limit = int(request.args.get("limit", config['RECIPES_PAGE_SIZE']))
+        except ValueError:
+            return {"message": "after_id and limit must be integers"}, 400
+        if after_id < 0 or not 1 <= limit <= config['RECIPES_MAX_PAGE_SIZE']:
+            return {
+                "message": "Invalid page",
+                "required": f"after_id >= 0, 1 <= limit <= {config['RECIPES_MAX_PAGE_SIZE']}"
+            }, 400
+        try:
+            fields = Recipe.parse_fields(request.args.get("fields"))
+        except ValueError as e:
+            return {"message": "Unknown fields", "fields": str(e)}, 400
+
+        res = Recipe.get_page(after_id=after_id, limit=limit, fields=fields)
+        return res, 200, {"X-Total-Count": str(Recipe.count())}
 
     def post(self):
         """
@@ -36,13 +72,7 @@ class RecipesHandler(Resource):
             dict: A dictionary containing a success or failure message and the newly created recipe (if successful).
         """
         form_data = request.get_json()
-        check_list = []
-
-        for r_k in Recipe.require_keys:
-            if not r_k in form_data:
-                check_list.append(r_k)
-            elif not form_data[r_k]:
-                check_list.append(r_k)
+        check_list = missing_keys(form_data, Recipe.require_keys)
 
         if check_list:
             res = {
@@ -130,3 +160,119 @@ class RecipeHandler(Resource):
         else:
             Recipe(id=id).delete()
             return {"message": "Recipe successfully removed!"}
+
+
+class RecipesBulkHandler(Resource):
+    @staticmethod
+    def _items(key):
+        """
+        Read the list of items under key from the request body.
+
+        Args:
+            key (str): "recipes" or "ids".
+
+        Returns:
+            tuple: The items, and an error response (or None if the list is valid).
+        """
+        form_data = request.get_json(silent=True) or {}
+        items = form_data.get(key) if isinstance(form_data, dict) else None
+        max_items = current_app.config['RECIPES_BULK_MAX_ITEMS']
+        if not isinstance(items, list) or not items:
+            return None, ({"message": "Bulk request failed!", "required": key}, 400)
+        if len(items) > max_items:
+            return None, ({"message": f"At most {max_items} {key} per request"}, 400)
+        return items, None
+
+    @staticmethod
+    def _check(items, keys):
+        """
+        Validate every item, returning a failure result for each invalid one.
+
+        Args:
+            items (list): The submitted recipes.
+            keys (list): The keys each recipe requires.
+
+        Returns:
+            dict: Failure results by item index.
+        """
+        failed = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                failed[index] = {"index": index, "status": "failed", "required": ", ".join(keys)}
+                continue
+            check_list = missing_keys(item, keys)
+            if "id" in keys and "id" not in check_list and not isinstance(item["id"], int):
+                check_list.insert(0, "id")
+            if check_list:
+                failed[index] = {"index": index, "status": "failed", "required": ", ".join(check_list)}
+        return failed
+
+    def post(self):
+        """
+        Handle POST requests to create many recipes at once.
+
+        Valid recipes are inserted together in one transaction; invalid ones are
+        reported and skipped.
+
+        Returns:
+            dict: A result for each submitted recipe, in request order.
+        """
+        items, error = self._items("recipes")
+        if error:
+            return error
+        failed = self._check(items, Recipe.require_keys)
+        valid = [i for i in range(len(items)) if i not in failed]
+        new_ids = dict(zip(valid, Recipe.bulk_new([items[i] for i in valid])))
+        return {
+            "message": "Bulk creation finished",
+            "results": [failed.get(i) or {"index": i, "status": "created", "id": new_ids[i]}
+                        for i in range(len(items))]
+        }
+
+    def patch(self):
+        """
+        Handle PATCH requests to update many recipes at once.
+
+        Every recipe needs its "id" and all required fields. Existing recipes
+        are updated together in one transaction; unknown IDs are reported as
+        not found.
+
+        Returns:
+            dict: A result for each submitted recipe, in request order.
+        """
+        items, error = self._items("recipes")
+        if error:
+            return error
+        failed = self._check(items, ["id"] + Recipe.require_keys)
+        valid = [i for i in range(len(items)) if i not in failed]
+        updated = dict(zip(valid, Recipe.bulk_update([items[i] for i in valid])))
+        return {
+            "message": "Bulk update finished",
+            "results": [failed.get(i) or {"index": i, "id": items[i]["id"],
+                                          "status": "updated" if updated[i] else "not_found"}
+                        for i in range(len(items))]
+        }
+
+    def delete(self):
+        """
+        Handle DELETE requests to remove many recipes at once.
+
+        Returns:
+            dict: A result for each submitted ID, in request order.
+        """
+        ids, error = self._items("ids")
+        if error:
+            return error
+        valid = [i for i, recipe_id in enumerate(ids) if isinstance(recipe_id, int)]
+        deleted = dict(zip(valid, Recipe.bulk_delete([ids[i] for i in valid])))
+        results = []
+        for index, recipe_id in enumerate(ids):
+            if index not in deleted:
+                results.append({"index": index, "status": "failed", "required": "id"})
+            else:
+                results.append({"index": index, "id": recipe_id,
+                                "status": "deleted" if deleted[index] else "not_found"})
+        return {
+            "message": "Bulk deletion finished",
+            "results": results
+        }
@@ -0,0 +1,201 @@
+"""
+Python script for caching model reads.
+
+This file defines a read-through cache with TTL and LRU eviction. Values are
+stored as JSON bytes behind the get/set/delete subset of the Redis client API,
+so the in-process LRUCache can be replaced by a Redis server shared by all
+gunicorn workers (CACHE_REDIS_URL).
+
+The in-process LRUCache is private to one worker: a write invalidates only
+the worker that served it, and the other workers may return the old recipe
+until its TTL runs out. It is only correct with a single worker; deployments
+with several workers should set CACHE_REDIS_URL.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import orjson
+from .serializers import dumps
+
+
+class LRUCache:
+    """
+    In-process cache backend with a per-entry TTL and LRU eviction.
+    """
+
+    def __init__(self, max_entries=1024, clock=time.monotonic):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of keys kept. Default is 1024.
+            clock (callable, optional): Time source in seconds. Default is time.monotonic.
+        """
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        expires_at = None if ex is None else self.clock() + ex
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class Cache:
+    """
+    Read-through cache over a backend, with hit/miss counters.
+
+    The backend is created on first use, so each gunicorn worker builds its
+    own (and its own Redis client) after fork.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, redis_url=None, prefix='recipes'):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (int, optional): Seconds an entry stays valid; None keeps entries until evicted.
+            max_entries (int, optional): Size of the in-process LRU backend.
+            redis_url (str, optional): Use a shared Redis backend at this URL instead.
+            prefix (str, optional): Namespace prepended to every key.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    def _create_backend(self):
+        if self.redis_url:
+            import redis  # Optional dependency, only needed for the shared backend
+            return redis.Redis.from_url(self.redis_url)
+        return LRUCache(max_entries=self.max_entries)
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def _generation_key(self, key):
+        return self._key(f"generation:{key}")
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        None results are not cached, so a later insert needs no invalidation.
+        A value whose key is invalidated while the loader runs is dropped
+        again after it is stored, so a slow reader cannot put back a row
+        read before the write.
+
+        Args:
+            key (str): The cache key.
+            loader (callable): Computes the value on a miss.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        cached = self.backend.get(self._key(key))
+        if cached is not None:
+            self.hits += 1
+            return orjson.loads(cached)
+        self.misses += 1
+        generation = self.backend.get(self._generation_key(key))
+        value = loader()
+        if value is not None:
+            self.backend.set(self._key(key), dumps(value), ex=self.ttl)
+            # invalidate() ran while loading: the value may predate the write
+            if self.backend.get(self._generation_key(key)) != generation:
+                self.backend.delete(self._key(key))
+        return value
+
+    def version(self, name):
+        """
+        Return the current version token of a group of keys.
+
+        Callers put the token into the keys of entries that cannot be listed
+        individually (e.g. list pages), and bump() it to invalidate them all.
+
+        Args:
+            name (str): The group name.
+
+        Returns:
+            str: The version token.
+        """
+        key = self._key(f"version:{name}")
+        token = self.backend.get(key)
+        if token is None:
+            token = str(time.time_ns()).encode()
+            self.backend.set(key, token)
+        return token.decode()
+
+    def bump(self, name):
+        """
+        Invalidate every entry keyed with the group's current version.
+
+        Args:
+            name (str): The group name.
+        """
+        self.backend.set(self._key(f"version:{name}"), str(time.time_ns()).encode())
+
+    def invalidate(self, *keys):
+        """
+        Remove keys from the cache.
+
+        Args:
+            *keys (str): The cache keys to remove.
+        """
+        if keys:
+            # New generations first, so a loader in flight sees the change
+            # once its stale value could be stored
+            token = str(time.time_ns()).encode()
+            for key in keys:
+                self.backend.set(self._generation_key(key), token, ex=self.ttl)
+            self.backend.delete(*(self._key(key) for key in keys))
+
+    def stats(self):
+        """
+        Return the hit/miss counters of this worker process.
+
+        Returns:
+            dict: Hits, misses and hit ratio.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "backend": "redis" if self.redis_url else "memory",
+        }
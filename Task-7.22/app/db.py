@@ -1,18 +1,29 @@
 """
 Python script for database connection management.
 
-This file defines the Database class as a singleton to manage database connections,
-including methods for connecting to the database and checking the connection status.
+This file defines the Database class as a singleton that manages a bounded pool
+of MySQL connections. Each Flask app context checks out one connection on first
+use and returns it to the pool when the context is torn down.
 
 Developer: WangPeifeng
 Date: 2024-05-28
 """
 
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
 import pymysql
-from flask import current_app
+from flask import current_app, g
+from pymysql.constants import SERVER_STATUS
 from pymysql.err import OperationalError
 
 
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
 class Database:
     _instance = None  # Class variable to hold the singleton instance of Database class
 
@@ -20,41 +31,171 @@ class Database:
         if not cls._instance:  # Check if an instance of the class already exists
             # Create a new instance using the superclass's __new__ method
             cls._instance = super(Database, cls).__new__(cls, *args, **kwargs)
-            cls._instance.connection = None  # Initialize connection attribute to None
+            cls._instance._reset_pool()  # Initialize an empty pool
+            if hasattr(os, 'register_at_fork'):
+                # Gunicorn workers must not share the parent's sockets
+                os.register_at_fork(after_in_child=cls._instance._reset_pool)
         return cls._instance  # Return the singleton instance of the class
 
-    def connect(self):
-        # Establish a new database connection if not already connected or if connection is not alive
-        if not self.connection or not self._is_connection_alive():
-            self.connection = pymysql.connect(
-                # Database host address from Flask app config
-                host=current_app.config['DB_HOST'],
-                # Database username from Flask app config
-                user=current_app.config['DB_USERNAME'],
-                # Database password from Flask app config
-                password=current_app.config['DB_PASSWORD'],
-                # Database name from Flask app config
-                database=current_app.config['DB_NAME'],
-                # Database port number from Flask app config
-                port=current_app.config['DB_PORT']
-            )
-        return self.connection  # Return the database connection object
-
-    def _is_connection_alive(self):
+    def _reset_pool(self):
+        # Idle connections as (connection, last used) pairs, most recent on top.
+        # A (None, 0) pair marks a freed slot and wakes a waiting checkout.
+        # Connections inherited across fork are dropped without QUIT; the
+        # parent process keeps using its own copies of the sockets.
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0  # Connections currently open, idle or checked out
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        """
+        Return the app context's connection to the pool on teardown.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.teardown_appcontext(self._teardown)
+
+    def _connect(self):
+        # Establish a new database connection using the Flask app config
+        return pymysql.connect(
+            # Database host address from Flask app config
+            host=current_app.config['DB_HOST'],
+            # Database username from Flask app config
+            user=current_app.config['DB_USERNAME'],
+            # Database password from Flask app config
+            password=current_app.config['DB_PASSWORD'],
+            # Database name from Flask app config
+            database=current_app.config['DB_NAME'],
+            # Database port number from Flask app config
+            port=current_app.config['DB_PORT'],
+            # Reads never hold a transaction (and a stale snapshot) open
+            autocommit=True
+        )
+
+    def _is_connection_alive(self, connection):
         try:
-            with self.connection.cursor() as cursor:
-                # Execute a test query to check if connection is alive
-                cursor.execute('SELECT 1')
-            # Return True if query executed successfully (connection is alive)
+            connection.ping(reconnect=False)  # One round-trip, only for idle connections
+            # Return True if ping succeeded (connection is alive)
             return True
-        except (AttributeError, OperationalError):
-            # Return False if AttributeError or OperationalError occurs (connection is not alive)
+        except (AttributeError, OperationalError, pymysql.err.InterfaceError):
+            # Return False if the ping failed (connection is not alive)
             return False
 
+    def _checkout(self):
+        """
+        Take a connection from the pool, opening one while below DB_POOL_SIZE.
+
+        Connections idle for longer than DB_POOL_PING_AFTER seconds are pinged
+        before use and replaced if the server dropped them.
+
+        Raises:
+            PoolTimeout: If the pool stays exhausted for DB_POOL_TIMEOUT seconds.
+        """
+        if self._pid != os.getpid():  # Forked without register_at_fork
+            self._reset_pool()
+        config = current_app.config
+        deadline = time.monotonic() + config['DB_POOL_TIMEOUT']
+        while True:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._size < config['DB_POOL_SIZE']:
+                        self._size += 1
+                        break
+                try:
+                    connection, last_used = self._idle.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise PoolTimeout(
+                        f"No database connection available within {config['DB_POOL_TIMEOUT']}s")
+            if connection is None:
+                continue  # A slot was freed; take it on the next pass
+            if time.monotonic() - last_used < config['DB_POOL_PING_AFTER'] \
+                    or self._is_connection_alive(connection):
+                return connection
+            self._discard(connection)  # Its slot is reused for a new connection
+            break
+
+        try:
+            return self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self):
+        with self._lock:
+            self._size -= 1
+        self._idle.put((None, 0))  # Wake a checkout waiting for a connection
+
+    def _checkin(self, connection):
+        if self._pid != os.getpid():
+            return  # Connection belongs to the parent process's pool
+        try:
+            # PyMySQL closes the socket when the server goes away or a read or
+            # write fails; such a connection must not be handed out again
+            if not connection.open:
+                raise OperationalError("Connection was closed")
+            if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                connection.rollback()  # Never hand out an open transaction
+            self._idle.put((connection, time.monotonic()))
+        except Exception:
+            self._discard(connection)
+            self._release_slot()
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _teardown(self, exception=None):
+        connection = g.pop('_db_connection', None)
+        if connection is None:
+            return
+        if isinstance(exception, (OperationalError, pymysql.err.InterfaceError)):
+            # The connection may be broken; do not hand it out again
+            self._discard(connection)
+            self._release_slot()
+        else:
+            self._checkin(connection)
+
+    def connect(self):
+        # Check out a connection for the current app context, once per context
+        if '_db_connection' not in g:
+            g._db_connection = self._checkout()
+        return g._db_connection  # Return the database connection object
+
     def get_cursor(self):
-        connection = self.connect()  # Ensure a connection is established
+        connection = self.connect()  # Ensure a connection is checked out
         return connection.cursor()  # Return a cursor object for executing queries
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run the block in one transaction on the app context's connection.
+
+        Connections are in autocommit mode, so writes that must succeed or
+        fail together start an explicit transaction. It is committed when the
+        block exits and rolled back if it raises.
+
+        Yields:
+            Cursor: A cursor on the connection.
+        """
+        connection = self.connect()
+        connection.begin()
+        cursor = connection.cursor()
+        try:
+            yield cursor
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
 
 # Create a singleton instance of the Database class
 db = Database()
@@ -0,0 +1,107 @@
+"""
+Python script for parameterized model queries.
+
+This file defines the Statement class, a SQL text with %s placeholders that is
+built once and executed with bound parameters, and the statement() factory that
+reuses Statement objects for texts built at runtime. Values are never formatted
+into the SQL, so every call of a statement sends the same text and the driver
+escapes the parameters.
+
+PyMySQL has no server-side prepared statements (COM_STMT_PREPARE); parameters
+are bound on the client. The saving available is on the Python side: statement
+texts are dedented once, and each pooled connection keeps one cursor that is
+reused by every statement instead of creating a cursor per query.
+"""
+
+import textwrap
+from functools import lru_cache
+from ..db import db
+
+
+def cursor_for(connection):
+    """
+    Return the cached cursor of a connection, creating it on first use.
+
+    The cursor is kept on the connection itself, so both are freed together
+    when the pool drops the connection.
+
+    Args:
+        connection (Connection): A connection checked out from the pool.
+
+    Returns:
+        Cursor: The connection's cursor.
+    """
+    cursor = getattr(connection, '_statement_cursor', None)
+    if cursor is None:
+        cursor = connection._statement_cursor = connection.cursor()
+    return cursor
+
+
+class Statement:
+    """
+    A parameterized SQL statement, run on the app context's connection.
+    """
+
+    def __init__(self, sql):
+        """
+        Initialize the statement.
+
+        Args:
+            sql (str): The SQL text with %s placeholders.
+        """
+        # Only the indentation is dropped: whitespace inside string literals is data
+        self.sql = textwrap.dedent(sql).strip()
+
+    def __repr__(self):
+        return f"Statement({self.sql!r})"
+
+    def execute(self, params=(), cursor=None):
+        """
+        Execute the statement with bound parameters.
+
+        Args:
+            params (tuple or list, optional): Values for the placeholders.
+            cursor (Cursor, optional): Run on this cursor, e.g. one from db.transaction().
+
+        Returns:
+            Cursor: The cursor holding the result; by default the connection's cached cursor.
+        """
+        if cursor is None:
+            cursor = cursor_for(db.connect())
+        cursor.execute(self.sql, params)
+        return cursor
+
+    def fetchone(self, params=()):
+        """
+        Execute the statement and return its first row.
+
+        Returns:
+            tuple or None: The row, or None if there is none.
+        """
+        return self.execute(params).fetchone()
+
+    def fetchall(self, params=()):
+        """
+        Execute the statement and return all rows.
+
+        Returns:
+            tuple: The rows.
+        """
+        return self.execute(params).fetchall()
+
+
+@lru_cache(maxsize=256)
+def statement(sql):
+    """
+    Return the shared Statement for a SQL text built at runtime.
+
+    Texts that vary only by structure (a projection, a number of rows) are
+    built by the caller; their values still go in as parameters.
+
+    Args:
+        sql (str): The SQL text with %s placeholders.
+
+    Returns:
+        Statement: The statement for this text.
+    """
+    return Statement(sql)
@@ -8,7 +8,17 @@ Developer: WangPeifeng
 Date: 2024-05-29
 """
 
+import config
+from ..cache import Cache
 from ..db import db
+from .query import Statement, statement
+
+# Read-through cache for recipe reads, invalidated by new, save and delete
+cache = Cache(
+    ttl=config.Config.CACHE_TTL,
+    max_entries=config.Config.CACHE_MAX_ENTRIES,
+    redis_url=config.Config.CACHE_REDIS_URL,
+)
 
 
 class Recipe:
@@ -16,6 +26,20 @@ class Recipe:
             "ingredients", "cost", "created_at", "updated_at"]
     require_keys = ["title", "making_time", "serves", "ingredients", "cost"]
 
+    # Statements of the single-recipe CRUD paths, built once
+    COUNT = Statement("SELECT COUNT(*) FROM recipes")
+    SELECT_BY_ID = Statement(f"SELECT {','.join(require_keys)} FROM recipes WHERE id = %s")
+    SELECT_FULL_BY_ID = Statement(f"SELECT {','.join(keys)} FROM recipes WHERE id = %s")
+    INSERT = Statement(f"""
+        INSERT INTO recipes ({','.join(require_keys)})
+        VALUES ({','.join(['%s'] * len(require_keys))})
+    """)
+    UPDATE = Statement(f"""
+        UPDATE recipes SET {', '.join(f'{k} = %s' for k in require_keys)} WHERE id = %s
+    """)
+    DELETE = Statement("DELETE FROM recipes WHERE id = %s")
+    INSERTED_IDS = Statement("SELECT id FROM recipes WHERE id >= %s ORDER BY id LIMIT %s")
+
     def __init__(self, id=None, title=None, making_time=None, serves=None, ingredients=None, cost=None):
         """
         Initialize a new Recipe instance.
@@ -57,38 +81,125 @@ class Recipe:
         return res
 
     @staticmethod
-    def get_all():
+    def cache_stats():
         """
-        Retrieve all recipes from the database.
+        Return the hit/miss counters of the recipe read cache.
 
         Returns:
-            dict: A dictionary containing a list of all recipes.
+            dict: Hits, misses, hit ratio and backend of this worker's cache.
         """
-        key_sql = ",".join(Recipe.require_keys)
-        cursor = db.get_cursor()
-        cursor.execute(f"SELECT id,{key_sql} FROM recipes")
-        results = cursor.fetchall()
-        cursor.close()
+        return cache.stats()
+
+    @staticmethod
+    def _cache_keys(recipe_id):
+        # Every cached single-recipe read; list pages are dropped by bumping "list"
+        return (f"recipe:{recipe_id}", f"recipe:{recipe_id}:full")
+
+    @classmethod
+    def parse_fields(cls, fields):
+        """
+        Validate a comma-separated field list against the recipe columns.
+
+        Args:
+            fields (str or None): The requested fields, e.g. "id,title".
+
+        Returns:
+            list: The requested columns, or the default listing columns if fields is empty.
+
+        Raises:
+            ValueError: If a field is not a recipe column.
+        """
+        if not fields:
+            return ["id"] + cls.require_keys
+        columns = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [c for c in columns if c not in cls.keys]
+        if unknown:
+            raise ValueError(", ".join(unknown))
+        return list(dict.fromkeys(columns))
+
+    @staticmethod
+    def count():
+        """
+        Count all recipes, from the cache when possible.
+
+        Returns:
+            int: The number of recipes.
+        """
+        return cache.get_or_load(f"count:{cache.version('list')}", Recipe._load_count)
+
+    @staticmethod
+    def _load_count():
+        return Recipe.COUNT.fetchone()[0]
+
+    @classmethod
+    def get_page(cls, after_id=0, limit=config.Config.RECIPES_PAGE_SIZE, fields=None):
+        """
+        Retrieve one page of recipes ordered by ID, from the cache when possible.
+
+        Args:
+            after_id (int, optional): Return recipes with an ID greater than this. Default is 0.
+            limit (int, optional): The maximum number of recipes returned.
+            fields (list, optional): The columns to return, as given by parse_fields.
+
+        Returns:
+            dict: The recipes of the page and the after_id of the next page (None on the last page).
+        """
+        fields = fields or cls.parse_fields(None)
+        key = f"page:{cache.version('list')}:{after_id}:{limit}:{','.join(fields)}"
+        return cache.get_or_load(key, lambda: cls._load_page(after_id, limit, fields))
+
+    @classmethod
+    def _load_page(cls, after_id, limit, fields):
+        """
+        Retrieve one page of recipes from the database.
+
+        Only the requested columns (plus id, for the keyset) are selected, and
+        one row past the page is read to tell whether another page follows.
+
+        Args:
+            after_id (int): Return recipes with an ID greater than this.
+            limit (int): The maximum number of recipes returned.
+            fields (list): The columns to return.
+
+        Returns:
+            dict: The recipes of the page and the after_id of the next page (None on the last page).
+        """
+        columns = ["id"] + [f for f in fields if f != "id"]
+        results = statement(
+            f"SELECT {','.join(columns)} FROM recipes WHERE id > %s ORDER BY id LIMIT %s"
+        ).fetchall((after_id, limit + 1))
 
         recipes = []
-        for row in results:
-            recipe = Recipe(
-                id=row[0],
-                title=row[1],
-                making_time=row[2],
-                serves=row[3],
-                ingredients=row[4],
-                cost=row[5],
-            )
-            recipes.append(recipe.json())
+        for row in results[:limit]:
+            data = dict(zip(columns, row))
+            for k in ("created_at", "updated_at"):
+                if data.get(k) is not None:
+                    data[k] = data[k].strftime('%Y-%m-%d %H:%M:%S')
+            recipes.append({k: data[k] for k in fields})
         return {
-            "recipes": recipes
+            "recipes": recipes,
+            "next_after_id": results[limit - 1][0] if len(results) > limit else None
         }
 
     @classmethod
     def get_by_id(cls, recipe_id, is_new=False):
         """
-        Retrieve a recipe by its ID.
+        Retrieve a recipe by its ID, from the cache when possible.
+
+        Args:
+            recipe_id (int): The ID of the recipe to retrieve.
+            is_new (bool, optional): Whether to include creation and update timestamps. Default is False.
+
+        Returns:
+            dict or None: A dictionary representing the recipe if found, otherwise None.
+        """
+        key = f"recipe:{recipe_id}:full" if is_new else f"recipe:{recipe_id}"
+        return cache.get_or_load(key, lambda: cls._load_by_id(recipe_id, is_new))
+
+    @classmethod
+    def _load_by_id(cls, recipe_id, is_new=False):
+        """
+        Retrieve a recipe by its ID from the database.
 
         Args:
             recipe_id (int): The ID of the recipe to retrieve.
@@ -98,16 +209,12 @@ class Recipe:
             dict or None: A dictionary representing the recipe if found, otherwise None.
         """
         if is_new:
-            keys = cls.keys
+            keys, query = cls.keys, cls.SELECT_FULL_BY_ID
         else:
-            keys = cls.require_keys
-        cursor = db.get_cursor()
-        cursor.execute(
-            f"SELECT {','.join(keys)} FROM recipes WHERE id = {recipe_id}")
-        result = cursor.fetchone()
+            keys, query = cls.require_keys, cls.SELECT_BY_ID
+        result = query.fetchone((recipe_id,))
         if not result:
             return None
-        cursor.close()
         data = {}
         for k, v in enumerate(keys):
             data[v] = result[k]
@@ -135,37 +242,130 @@ class Recipe:
         Returns:
             dict: A dictionary representing the newly created recipe.
         """
-        sql = f"""
-            INSERT INTO recipes ({','.join(cls.require_keys)})
-            VALUES ('{title}', '{making_time}',
-                    '{serves}', '{ingredients}', {cost})
-        """
-        cursor = db.get_cursor()
-        cursor.execute(sql)
-        new_id = cursor.connection.insert_id()
-        cursor.connection.commit()
-        cursor.close()
+        # Connections run in autocommit mode, so the row is committed here
+        new_id = cls.INSERT.execute((title, making_time, serves, ingredients, cost)).lastrowid
+        cache.bump("list")
         return cls.get_by_id(new_id, True)
 
     def save(self):
         """
         Save updates to an existing recipe in the database.
         """
-        sql = f"""
-            UPDATE recipes SET title = '{self.title}', making_time = '{self.making_time}', serves = '{self.serves}',
-            ingredients = '{self.ingredients}', cost = {self.cost} WHERE id = {self.id}
-        """
-        cursor = db.get_cursor()
-        cursor.execute(sql)
-        cursor.connection.commit()
-        cursor.close()
+        self.UPDATE.execute((self.title, self.making_time, self.serves,
+                             self.ingredients, self.cost, self.id))
+        cache.invalidate(*self._cache_keys(self.id))
+        cache.bump("list")
 
     def delete(self):
         """
         Delete the recipe from the database if it has an ID.
         """
         if self.id:
-            cursor = db.get_cursor()
-            cursor.execute(f"DELETE FROM recipes WHERE id = {self.id}")
-            cursor.connection.commit()
-            cursor.close()
+            self.DELETE.execute((self.id,))
+            cache.invalidate(*self._cache_keys(self.id))
+            cache.bump("list")
+
+    @staticmethod
+    def _values(rows, width):
+        # Placeholders of a multi-row VALUES list
+        row = "(" + ",".join(["%s"] * width) + ")"
+        return ",".join([row] * rows)
+
+    @staticmethod
+    def _lock_existing(cursor, ids):
+        # Lock the rows of ids that exist, so the batch sees a stable set
+        statement(
+            f"SELECT id FROM recipes WHERE id IN ({','.join(['%s'] * len(ids))}) FOR UPDATE"
+        ).execute(list(ids), cursor)
+        return {row[0] for row in cursor.fetchall()}
+
+    @classmethod
+    def bulk_new(cls, items):
+        """
+        Create recipes with one multi-row INSERT in a single transaction.
+
+        The IDs are read back inside the transaction: the first is
+        LAST_INSERT_ID(), the rest are the next rows by ID, whatever
+        auto_increment_increment is. The read sees this transaction's rows
+        and rows other sessions committed before it, not their uncommitted
+        ones, so another statement's IDs can only be mixed in if it took IDs
+        between these (possible with innodb_autoinc_lock_mode = 2) and
+        committed first.
+
+        Args:
+            items (list): Dictionaries with every key in require_keys.
+
+        Returns:
+            list: The IDs of the new recipes, in the order of items.
+        """
+        if not items:
+            return []
+        params = [item[k] for item in items for k in cls.require_keys]
+        with db.transaction() as cursor:
+            statement(
+                f"INSERT INTO recipes ({','.join(cls.require_keys)}) "
+                f"VALUES {cls._values(len(items), len(cls.require_keys))}"
+            ).execute(params, cursor)
+            if cursor.rowcount != len(items):
+                raise RuntimeError(f"Inserted {cursor.rowcount} of {len(items)} recipes")
+            first_id = cursor.lastrowid
+            ids = [row[0] for row in cls.INSERTED_IDS.execute(
+                (first_id, len(items)), cursor).fetchall()]
+            if len(ids) != len(items) or ids[0] != first_id:
+                raise RuntimeError(f"Could not read back the IDs of {len(items)} new recipes")
+        cache.bump("list")
+        return ids
+
+    @classmethod
+    def bulk_update(cls, items):
+        """
+        Update existing recipes with one multi-row upsert in a single transaction.
+
+        Recipes that do not exist are left out, so the upsert only ever takes
+        its ON DUPLICATE KEY UPDATE branch. The new values are read through the
+        row alias (MySQL 8.0.19+), as VALUES(col) there is deprecated.
+
+        Args:
+            items (list): Dictionaries with an "id" and every key in require_keys.
+
+        Returns:
+            list: Whether each item's recipe existed and was updated, in the order of items.
+        """
+        if not items:
+            return []
+        columns = ["id"] + cls.require_keys
+        with db.transaction() as cursor:
+            existing = cls._lock_existing(cursor, {item["id"] for item in items})
+            found = [item for item in items if item["id"] in existing]
+            if found:
+                statement(
+                    f"INSERT INTO recipes ({','.join(columns)}) "
+                    f"VALUES {cls._values(len(found), len(columns))} AS new ON DUPLICATE KEY UPDATE "
+                    + ",".join(f"{k} = new.{k}" for k in cls.require_keys)
+                ).execute([item[k] for item in found for k in columns], cursor)
+        cache.invalidate(*(key for recipe_id in existing for key in cls._cache_keys(recipe_id)))
+        cache.bump("list")
+        return [item["id"] in existing for item in items]
+
+    @classmethod
+    def bulk_delete(cls, ids):
+        """
+        Delete recipes with one DELETE ... IN statement in a single transaction.
+
+        Args:
+            ids (list): The IDs of the recipes to delete.
+
+        Returns:
+            list: Whether each recipe existed and was deleted, in the order of ids.
+        """
+        if not ids:
+            return []
+        with db.transaction() as cursor:
+            existing = cls._lock_existing(cursor, set(ids))
+            if existing:
+                statement(
+                    f"DELETE FROM recipes WHERE id IN ({','.join(['%s'] * len(existing))})"
+                ).execute(sorted(existing), cursor)
+        cache.invalidate(*(key for recipe_id in existing for key in cls._cache_keys(recipe_id)))
+        cache.bump("list")
+        return [recipe_id in existing for recipe_id in ids]
@@ -9,10 +9,16 @@ Date: 2024-05-29
 """
 
 from flask_restful import Api
-from .api.recipes import RecipesHandler, RecipeHandler
+from .api.cache import CacheStatsHandler
+from .api.recipes import RecipesBulkHandler, RecipesHandler, RecipeHandler
+from .serializers import output_json
 
 
 def create_routes(app):
     api = Api(app)
+    # Render resource responses with orjson instead of the stdlib json module
+    api.representations['application/json'] = output_json
     api.add_resource(RecipesHandler, '/recipes')
+    api.add_resource(RecipesBulkHandler, '/recipes/bulk')
     api.add_resource(RecipeHandler, '/recipes/<int:id>')
+    api.add_resource(CacheStatsHandler, '/cache/stats')
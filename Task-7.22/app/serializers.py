@@ -0,0 +1,76 @@
+"""
+Python script for JSON serialization of API responses.
+
+This file defines the orjson-based encoder used for every JSON response of
+the application: the flask_restful representation for resources and the
+Flask JSON provider behind jsonify.
+"""
+
+from decimal import Decimal
+
+import orjson
+from flask import make_response
+from flask.json.provider import JSONProvider
+
+
+def _default(obj):
+    """
+    Serialize the types orjson does not handle natively.
+
+    Args:
+        obj: The object to serialize.
+
+    Returns:
+        float: Decimal values (MySQL DECIMAL columns) as JSON numbers.
+
+    Raises:
+        TypeError: If the object cannot be serialized.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj):
+    """
+    Serialize an object to JSON bytes.
+
+    datetime and date values are rendered as ISO 8601 strings by orjson.
+
+    Args:
+        obj: The object to serialize.
+
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    return orjson.dumps(obj, default=_default)
+
+
+def output_json(data, code, headers=None):
+    """
+    flask_restful representation for 'application/json'.
+
+    Args:
+        data: The data returned by the resource.
+        code (int): The HTTP status code.
+        headers (dict, optional): Extra response headers.
+
+    Returns:
+        Response: The JSON response.
+    """
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson, used by jsonify and request.get_json.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
@@ -22,6 +22,15 @@ class Config:
     DB_PORT = 3306  # Database port number
     DB_USERNAME = 'wangpeifeng'  # Database username
     DB_PASSWORD = '123qwe'  # Database password
+    DB_POOL_SIZE = 10  # Maximum open database connections per worker process
+    DB_POOL_TIMEOUT = 10  # Seconds to wait for a free connection before failing
+    DB_POOL_PING_AFTER = 30  # Idle seconds after which a connection is pinged before reuse
+    RECIPES_PAGE_SIZE = 100  # Default page size of GET /recipes
+    RECIPES_MAX_PAGE_SIZE = 1000  # Largest page size GET /recipes accepts
+    RECIPES_BULK_MAX_ITEMS = 1000  # Most recipes one /recipes/bulk request may write
+    CACHE_TTL = 300  # Seconds a cached recipe read stays valid
+    CACHE_MAX_ENTRIES = 1024  # Keys kept by the in-process LRU cache
+    CACHE_REDIS_URL = None  # e.g. 'redis://127.0.0.1:6379/0'; required with more than one worker, or workers serve stale reads for up to CACHE_TTL
     LOG_LEVEL = logging.INFO  # Logging level for application
     LOG_PATH = 'app.log'  # Path to log file
 
@@ -0,0 +1,89 @@
+"""
+Python script with the stand-ins shared by the unit tests.
+
+This file defines a fake PyMySQL connection and cursor for the pool and
+statement tests, a helper that points the pool at them, and a settable clock
+for the cache tests, so no MySQL server is required.
+"""
+
+from unittest import mock
+from pymysql.constants import SERVER_STATUS
+from app import create_app
+from app.db import Database, db
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = []
+        self.lastrowid = 7
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return ("Soup", "10 min", "2 people", "water", 100)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.server_status = 0
+        self.pings = 0
+        self.closed = False
+        self.open = True
+        self.commits = 0
+        self.cursors = []
+
+    def begin(self):
+        self.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def commit(self):
+        self.commits += 1
+        self.server_status = 0
+
+    def cursor(self):
+        self.cursors.append(FakeCursor())
+        return self.cursors[-1]
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def rollback(self):
+        self.server_status = 0
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def use_fake_database(testcase, **config):
+    """
+    Create an app whose empty pool opens FakeConnections for one test.
+
+    Args:
+        testcase (unittest.TestCase): The test the patch is undone after.
+        **config: Settings applied to the app before the pool is used.
+
+    Returns:
+        Flask: The app.
+    """
+    app = create_app()
+    app.config.update(config)
+    db._reset_pool()
+    patcher = mock.patch.object(Database, '_connect', lambda self: FakeConnection())
+    patcher.start()
+    testcase.addCleanup(patcher.stop)
+    return app
@@ -98,6 +98,59 @@ class BasicsTestCase(unittest.TestCase):
         self.assertTrue("recipes" in data)
         self.assertIsInstance(data["recipes"], list)
 
+    # Test to check keyset pagination and field selection of the '/recipes' endpoint
+    def test_response_get_page(self):
+        response = self.client.get('/recipes?limit=1&fields=id,title')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data["recipes"]), 1)
+        self.assertEqual(set(data["recipes"][0]), {"id", "title"})
+        self.assertTrue(int(response.headers["X-Total-Count"]) >= 1)
+
+        if data["next_after_id"] is not None:
+            response = self.client.get(f'/recipes?limit=1&after_id={data["next_after_id"]}')
+            next_page = json.loads(response.data)
+            self.assertTrue(next_page["recipes"][0]["id"] > data["recipes"][0]["id"])
+
+    # Test to check the response for an unknown field in a GET request to '/recipes'
+    def test_response_get_invalid_fields(self):
+        response = self.client.get('/recipes?fields=title,password')
+        self.assertEqual(response.status_code, 400)
+
+    # Test to check bulk creation, update and deletion through '/recipes/bulk'
+    def test_response_bulk(self):
+        recipe = {
+            "title": "Bulk Soup",
+            "making_time": "10 min",
+            "serves": "2 people",
+            "ingredients": "water, salt",
+            "cost": 100
+        }
+        response = self.client.post(
+            '/recipes/bulk', json={"recipes": [recipe, dict(recipe, title=""), recipe]})
+        results = json.loads(response.data)["results"]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in results], ["created", "failed", "created"])
+        self.assertEqual(results[1]["required"], "title")
+        ids = [results[0]["id"], results[2]["id"]]
+
+        response = self.client.patch(
+            '/recipes/bulk', json={"recipes": [dict(recipe, id=ids[0], cost=200),
+                                               dict(recipe, id=ids[1] + 1000000)]})
+        results = json.loads(response.data)["results"]
+        self.assertEqual([r["status"] for r in results], ["updated", "not_found"])
+        response = self.client.get(f'/recipes/{ids[0]}')
+        self.assertEqual(json.loads(response.data)["recipe"][0]["cost"], 200)
+
+        response = self.client.delete('/recipes/bulk', json={"ids": ids + [ids[1] + 1000000]})
+        results = json.loads(response.data)["results"]
+        self.assertEqual([r["status"] for r in results], ["deleted", "deleted", "not_found"])
+
+    # Test to check that a bulk request without items is rejected
+    def test_response_bulk_empty(self):
+        response = self.client.post('/recipes/bulk', json={"recipes": []})
+        self.assertEqual(response.status_code, 400)
+
     # Test to check the response for a GET request to the '/recipes/<id>' endpoint
     def test_response_get_id(self):
         response = self.client.get('/recipes/1')
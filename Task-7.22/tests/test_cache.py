@@ -0,0 +1,151 @@
+"""
+Python script for unit testing the recipe read cache.
+
+This file tests TTL and LRU eviction of the in-process backend, read-through
+loading with hit/miss counters, invalidation of recipe reads and list pages
+by single and bulk writes (including reads that race a write), and the
+paginated recipe listing, with the database layer stubbed out so no MySQL
+server is required.
+"""
+
+import unittest
+from unittest import mock
+from app import create_app
+from app.cache import Cache, LRUCache
+from app.models import query as query_module
+from app.models import recipe as recipe_module
+from app.models.recipe import Recipe
+from tests.fakes import FakeClock
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    # Entries expire after their TTL; entries without one do not
+    def test_ttl(self):
+        clock = FakeClock()
+        backend = LRUCache(clock=clock)
+        backend.set("a", b"1", ex=10)
+        backend.set("b", b"2")
+        clock.now = 10
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.get("b"), b"2")
+
+    # The least recently used key is evicted first
+    def test_lru_eviction(self):
+        backend = LRUCache(max_entries=2)
+        backend.set("a", b"1")
+        backend.set("b", b"2")
+        backend.get("a")
+        backend.set("c", b"3")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), b"1")
+
+
+class RecipeCacheTestCase(unittest.TestCase):
+    # Use a fresh cache and a stubbed database layer for every test
+    def setUp(self):
+        self.cache = Cache(ttl=60)
+        patcher = mock.patch.object(recipe_module, 'cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rows = {1: {"title": "Soup", "id": 1}}
+        load = mock.patch.object(Recipe, '_load_by_id',
+                                 side_effect=lambda recipe_id, is_new=False: self.rows.get(recipe_id))
+        self.load_by_id = load.start()
+        self.addCleanup(load.stop)
+        self.db = mock.patch.object(recipe_module, 'db').start()
+        mock.patch.object(query_module, 'db').start()
+        self.addCleanup(mock.patch.stopall)
+
+    # Repeated reads are served from the cache and counted
+    def test_read_through(self):
+        self.assertEqual(Recipe.get_by_id(1), {"title": "Soup", "id": 1})
+        self.assertEqual(Recipe.get_by_id(1), {"title": "Soup", "id": 1})
+        self.assertEqual(self.load_by_id.call_count, 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    # Misses are not cached, so a recipe created later is found
+    def test_missing_recipe_not_cached(self):
+        self.assertIsNone(Recipe.get_by_id(2))
+        self.rows[2] = {"title": "Curry", "id": 2}
+        self.assertEqual(Recipe.get_by_id(2)["title"], "Curry")
+
+    # save and delete invalidate the recipe's cached reads
+    def test_writes_invalidate(self):
+        Recipe.get_by_id(1)
+        self.rows[1] = {"title": "Stew", "id": 1}
+        Recipe(id=1, title="Stew", making_time="1 h", serves="2", ingredients="x", cost=1).save()
+        self.assertEqual(Recipe.get_by_id(1)["title"], "Stew")
+
+        del self.rows[1]
+        Recipe(id=1).delete()
+        self.assertIsNone(Recipe.get_by_id(1))
+
+    # A read that loaded the old row before a concurrent write does not cache it
+    def test_invalidate_during_load(self):
+        def load_then_write(recipe_id, is_new=False):
+            row = dict(self.rows[recipe_id])
+            self.rows[1] = {"title": "Stew", "id": 1}
+            Recipe(id=1, title="Stew", making_time="1 h", serves="2", ingredients="x", cost=1).save()
+            return row
+
+        self.load_by_id.side_effect = load_then_write
+        self.assertEqual(Recipe.get_by_id(1)["title"], "Soup")
+        self.load_by_id.side_effect = lambda recipe_id, is_new=False: self.rows.get(recipe_id)
+        self.assertEqual(Recipe.get_by_id(1)["title"], "Stew")
+
+    # List pages and the total count are dropped by any write
+    def test_writes_invalidate_pages(self):
+        load_page = mock.patch.object(Recipe, '_load_page', return_value={
+            "recipes": [{"id": 1}], "next_after_id": None}).start()
+        load_count = mock.patch.object(Recipe, '_load_count', return_value=1).start()
+        Recipe.get_page(limit=10)
+        Recipe.count()
+        Recipe.get_page(limit=10)
+        Recipe.count()
+        self.assertEqual((load_page.call_count, load_count.call_count), (1, 1))
+
+        Recipe(id=1).delete()
+        Recipe.get_page(limit=10)
+        Recipe.count()
+        self.assertEqual((load_page.call_count, load_count.call_count), (2, 2))
+
+    # GET /recipes pages by after_id/limit, projects fields and reports the total
+    def test_recipes_page_endpoint(self):
+        load_page = mock.patch.object(Recipe, '_load_page', return_value={
+            "recipes": [{"id": 3, "title": "Soup"}], "next_after_id": 3}).start()
+        mock.patch.object(Recipe, '_load_count', return_value=7).start()
+        client = create_app().test_client()
+        response = client.get('/recipes?after_id=2&limit=1&fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Total-Count"], "7")
+        self.assertEqual(response.get_json()["next_after_id"], 3)
+        load_page.assert_called_once_with(2, 1, ["id", "title"])
+
+        for query in ('limit=0', 'limit=x', 'after_id=-1', 'fields=id,password'):
+            self.assertEqual(client.get(f'/recipes?{query}').status_code, 400)
+
+    # Bulk writes drop the cached reads of every recipe they touch
+    def test_bulk_writes_invalidate(self):
+        self.rows[2] = {"title": "Curry", "id": 2}
+        Recipe.get_by_id(1)
+        Recipe.get_by_id(2)
+        cursor = self.db.transaction.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [(1,), (2,)]
+        self.rows[1] = {"title": "Stew", "id": 1}
+        self.rows[2] = {"title": "Pie", "id": 2}
+        self.assertEqual(Recipe.bulk_delete([1, 2, 3]), [True, True, False])
+        self.assertEqual(Recipe.get_by_id(1)["title"], "Stew")
+        self.assertEqual(Recipe.get_by_id(2)["title"], "Pie")
+
+    # The counters are exposed over the API
+    def test_stats_endpoint(self):
+        Recipe.get_by_id(1)
+        client = create_app().test_client()
+        response = client.get('/cache/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["misses"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
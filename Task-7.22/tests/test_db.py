@@ -0,0 +1,132 @@
+"""
+Python script for unit testing the database connection pool.
+
+This file tests checkout per app context, idle-time validation, transaction
+cleanup, explicit transactions, the pool size limit and fork re-initialization,
+using the stand-in connections of tests/fakes.py so no MySQL server is
+required.
+"""
+
+import os
+import time
+import threading
+import unittest
+from pymysql.constants import SERVER_STATUS
+from pymysql.err import OperationalError
+from app.db import PoolTimeout, db
+from tests.fakes import use_fake_database
+
+
+class DatabasePoolTestCase(unittest.TestCase):
+    # Set up an app with a small pool and stand-in connections
+    def setUp(self):
+        self.app = use_fake_database(self, DB_POOL_SIZE=2, DB_POOL_TIMEOUT=0.1,
+                                     DB_POOL_PING_AFTER=60)
+
+    # One connection per app context, reused by later contexts without a ping
+    def test_checkout_per_app_context(self):
+        with self.app.app_context():
+            connection = db.connect()
+            self.assertIs(db.connect(), connection)
+        with self.app.app_context():
+            self.assertIs(db.connect(), connection)
+        self.assertEqual(connection.pings, 0)
+        self.assertEqual(db._size, 1)
+
+    # Connections idle for longer than DB_POOL_PING_AFTER are validated
+    def test_idle_connection_is_pinged(self):
+        self.app.config['DB_POOL_PING_AFTER'] = 0
+        with self.app.app_context():
+            connection = db.connect()
+        time.sleep(0.01)
+        with self.app.app_context():
+            self.assertIs(db.connect(), connection)
+        self.assertEqual(connection.pings, 1)
+
+    # An open transaction is rolled back before the connection is reused
+    def test_open_transaction_rolled_back(self):
+        with self.app.app_context():
+            connection = db.connect()
+            connection.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        self.assertEqual(connection.server_status, 0)
+
+    # A connection the driver closed during a request is not returned to the pool,
+    # even though the app's error handler hides the exception from teardown
+    def test_closed_connection_discarded(self):
+        @self.app.route('/gone-away')
+        def gone_away():
+            connection = db.connect()
+            connection.open = False  # What PyMySQL does on error 2006
+            raise OperationalError(2006, 'MySQL server has gone away')
+
+        response = self.app.test_client().get('/gone-away')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(db._size, 0)
+        with self.app.app_context():
+            connection = db.connect()
+            self.assertTrue(connection.open)
+
+    # Discarding a connection wakes a checkout waiting for a free slot
+    def test_discard_wakes_waiter(self):
+        self.app.config.update(DB_POOL_SIZE=1, DB_POOL_TIMEOUT=5)
+        checked_out = threading.Event()
+        waited = []
+
+        def waiter():
+            checked_out.wait()
+            start = time.monotonic()
+            with self.app.app_context():
+                db.connect()
+            waited.append(time.monotonic() - start)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        with self.assertRaises(OperationalError):
+            with self.app.app_context():
+                db.connect()
+                checked_out.set()
+                time.sleep(0.05)
+                raise OperationalError(2013, 'Lost connection to MySQL server')
+        thread.join()
+        self.assertLess(waited[0], 1)
+
+    # transaction() commits on success and rolls back when the block raises
+    def test_transaction(self):
+        with self.app.app_context():
+            with db.transaction():
+                connection = db.connect()
+                self.assertTrue(connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+            self.assertEqual((connection.commits, connection.server_status), (1, 0))
+            with self.assertRaises(ValueError):
+                with db.transaction():
+                    raise ValueError
+            self.assertEqual((connection.commits, connection.server_status), (1, 0))
+
+    # Checkout fails after DB_POOL_TIMEOUT when every connection is in use
+    def test_pool_is_bounded(self):
+        with self.app.app_context():
+            db.connect()
+            with self.app.app_context():
+                db.connect()
+                with self.app.app_context():
+                    with self.assertRaises(PoolTimeout):
+                        db.connect()
+        self.assertEqual(db._idle.qsize(), 2)
+
+    # A forked worker starts with an empty pool of its own
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_pool_reset_after_fork(self):
+        with self.app.app_context():
+            db.connect()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write_fd, f"{db._size},{db._idle.qsize()}".encode())
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read_fd, 100), b"0,0")
+        self.assertEqual(db._size, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Python script for unit testing the parameterized statement layer.
+
+This file tests that statements are sent with bound parameters instead of
+formatted values, that each pooled connection reuses one cursor, and that
+runtime-built statement texts share one Statement object, using the stand-in
+connections of tests/fakes.py so no MySQL server is required.
+"""
+
+import gc
+import unittest
+import weakref
+from unittest import mock
+import pymysql
+from app.db import db
+from app.models.query import Statement, cursor_for, statement
+from app.models.recipe import Recipe
+from tests.fakes import FakeCursor, use_fake_database
+
+
+class StatementTestCase(unittest.TestCase):
+    # Set up an app whose pool hands out stand-in connections
+    def setUp(self):
+        self.app = use_fake_database(self)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+
+    # The SQL text is dedented once and values are passed as parameters
+    def test_parameters_are_bound(self):
+        query = Statement("""
+            SELECT title FROM recipes
+            WHERE id = %s
+        """)
+        self.assertEqual(query.sql, "SELECT title FROM recipes\nWHERE id = %s")
+        query.execute((1,))
+        cursor = db.connect().cursors[0]
+        self.assertEqual(cursor.executed, [(query.sql, (1,))])
+
+    # Whitespace inside string literals is kept
+    def test_literal_whitespace_kept(self):
+        query = Statement("  SELECT id FROM recipes WHERE title = 'a  b'\n")
+        self.assertEqual(query.sql, "SELECT id FROM recipes WHERE title = 'a  b'")
+
+    # Every statement on a connection runs on the same cursor
+    def test_cursor_reused_per_connection(self):
+        Recipe.SELECT_BY_ID.fetchone((1,))
+        Recipe.DELETE.execute((1,))
+        connection = db.connect()
+        self.assertEqual(len(connection.cursors), 1)
+        self.assertEqual([sql for sql, _ in connection.cursors[0].executed],
+                         [Recipe.SELECT_BY_ID.sql, Recipe.DELETE.sql])
+
+    # A connection dropped by the pool is freed together with its cached cursor
+    def test_dropped_connection_is_collected(self):
+        connection = pymysql.connections.Connection(defer_connect=True)
+        cursor = cursor_for(connection)
+        self.assertIs(cursor_for(connection), cursor)
+        ref = weakref.ref(connection)
+        del connection, cursor
+        gc.collect()
+        self.assertIsNone(ref())
+
+    # Runtime-built texts map to one shared Statement
+    def test_statement_cache(self):
+        sql = "SELECT id,title FROM recipes WHERE id > %s ORDER BY id LIMIT %s"
+        self.assertIs(statement(sql), statement(sql))
+
+    # Quotes in values reach the driver as data, not as SQL
+    def test_recipe_new_is_parameterized(self):
+        with mock.patch('app.models.recipe.cache'), \
+                mock.patch.object(Recipe, 'get_by_id') as get_by_id:
+            Recipe.new(title="Grandma's Soup", making_time="10 min", serves="2 people",
+                       ingredients="water", cost=100)
+        executed = db.connect().cursors[0].executed
+        self.assertEqual(executed, [(Recipe.INSERT.sql,
+                                     ("Grandma's Soup", "10 min", "2 people", "water", 100))])
+        get_by_id.assert_called_once_with(7, True)
+
+    # New IDs are read back inside the insert's transaction
+    def test_bulk_new_reads_ids_back(self):
+        items = [dict(title=f"Soup {i}", making_time="10 min", serves="2 people",
+                      ingredients="water", cost=100) for i in range(3)]
+        with mock.patch('app.models.recipe.cache'), \
+                mock.patch.object(FakeCursor, 'rowcount', 3, create=True), \
+                mock.patch.object(FakeCursor, 'fetchall', return_value=[(7,), (9,), (11,)]):
+            self.assertEqual(Recipe.bulk_new(items), [7, 9, 11])
+        executed = db.connect().cursors[-1].executed
+        self.assertEqual(executed[-1], (Recipe.INSERTED_IDS.sql, (7, 3)))
+
+    # The upsert reads new values through the row alias, not VALUES(col)
+    def test_bulk_update_uses_row_alias(self):
+        item = dict(id=7, title="Stew", making_time="1 h", serves="2", ingredients="x", cost=1)
+        with mock.patch('app.models.recipe.cache'), \
+                mock.patch.object(FakeCursor, 'fetchall', return_value=[(7,)]):
+            self.assertEqual(Recipe.bulk_update([item]), [True])
+        sql = db.connect().cursors[-1].executed[-1][0]
+        self.assertIn(" AS new ON DUPLICATE KEY UPDATE title = new.title,", sql)
+        self.assertNotIn("VALUES(", sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
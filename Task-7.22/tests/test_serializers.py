@@ -0,0 +1,57 @@
+"""
+Python script for unit testing the JSON serializers.
+
+This file tests the orjson encoder directly: DECIMAL and datetime values,
+rejection of unsupported types, the flask_restful representation and the
+Flask JSON provider behind jsonify and request.get_json.
+"""
+
+import datetime
+import unittest
+from decimal import Decimal
+import orjson
+from flask import jsonify, request
+from app import create_app
+from app.serializers import dumps, output_json
+
+
+class SerializersTestCase(unittest.TestCase):
+    # Push an app context so responses can be built
+    def setUp(self):
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+
+    # DECIMAL columns become JSON numbers, datetimes ISO 8601 strings
+    def test_dumps(self):
+        row = {"cost": Decimal("1000.50"), "title": "Soup",
+               "created_at": datetime.datetime(2024, 5, 29, 12, 30),
+               "day": datetime.date(2024, 5, 29)}
+        self.assertEqual(dumps(row),
+                         b'{"cost":1000.5,"title":"Soup",'
+                         b'"created_at":"2024-05-29T12:30:00","day":"2024-05-29"}')
+
+    # Types without an encoding are rejected instead of being stringified
+    def test_dumps_rejects_unknown_types(self):
+        with self.assertRaises(orjson.JSONEncodeError):
+            dumps({"value": object()})
+
+    # The flask_restful representation keeps the status code and headers
+    def test_output_json(self):
+        response = output_json({"cost": Decimal("12")}, 201, {"X-Total-Count": "1"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.headers["X-Total-Count"], "1")
+        self.assertEqual(orjson.loads(response.get_data()), {"cost": 12.0})
+
+    # jsonify and request.get_json go through the orjson provider
+    def test_json_provider(self):
+        self.assertEqual(jsonify(cost=Decimal("2.5")).get_data(), b'{"cost":2.5}')
+        with self.app.test_request_context(method='POST', data='{"title": "Soup"}',
+                                           content_type='application/json'):
+            self.assertEqual(request.get_json(), {"title": "Soup"})
+
+
+if __name__ == '__main__':
+    unittest.main()